@@ -0,0 +1,161 @@
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from indicators import atr as atr_kernel
+from session_calendar import SESSION_CODES, MINUTES_PER_DAY, local_minutes
+from schema import StructureEvent, ID_KIND_MASK, event_key
+
+# Timeframe name -> bucket size in minutes (None = whole session / whole trading day)
+DEFAULT_TIMEFRAMES: Dict[str, Optional[int]] = {
+    '5m': 5,
+    '15m': 15,
+    '1h': 60,
+    'session': None,
+    'daily': None,
+}
+
+PYRAMID_VERSION = "1"
+
+
+def build_bars(df: pd.DataFrame, timeframe: str, session_starts: Dict[str, int], day_start: int,
+               minutes: Optional[int] = None, atr_length: int = 14) -> pd.DataFrame:
+    """
+    Aggregates 1m bars into one higher-timeframe level.
+
+    Session-aware boundaries: intraday buckets are anchored at the start of the session
+    they belong to and never span a session change or the 18:00 trading-day rollover
+    (so a 1h NY bar runs 09:30-10:30, not 09:00-10:00 mixed with London).
+
+    Output columns mirror the 1m frame (time = nominal bucket open, OHLCV, session,
+    trading_date, calendar flags, atr recomputed on this timeframe, vwap as of the bar
+    close, previous-day refs) plus the index maps into the 1m rows:
+        first_idx / last_idx : first and last 1m row of the bar
+    """
+    n = len(df)
+    mod = local_minutes(df['time']) % MINUTES_PER_DAY
+    day = df['trading_date'].to_numpy().astype('datetime64[D]').astype(np.int64)
+
+    if timeframe == 'daily':
+        elapsed = (mod - day_start) % MINUTES_PER_DAY
+        bucket = np.zeros(n, dtype=np.int64)
+        code = np.zeros(n, dtype=np.int64)
+    else:
+        labels = df['session'].astype(str).to_numpy()
+        code = np.zeros(n, dtype=np.int64)
+        start = np.zeros(n, dtype=np.int64)
+        for label, c in SESSION_CODES.items():
+            m = labels == label
+            code[m] = c
+            start[m] = session_starts[label]
+        elapsed = (mod - start) % MINUTES_PER_DAY
+        bucket = elapsed // minutes if minutes else np.zeros(n, dtype=np.int64)
+
+    # A new bar starts wherever (trading day, session, bucket) changes
+    if n:
+        change = np.r_[True, (day[1:] != day[:-1]) | (code[1:] != code[:-1]) | (bucket[1:] != bucket[:-1])]
+    else:
+        change = np.zeros(0, dtype=bool)
+    first_idx = np.flatnonzero(change).astype(np.int64)
+    last_idx = np.r_[first_idx[1:] - 1, n - 1].astype(np.int64) if n else first_idx
+
+    # Nominal open of the bucket (first print may come late if bars are missing)
+    into_bucket = elapsed[first_idx] - (bucket[first_idx] * minutes if minutes else 0)
+    times = df['time'].iloc[first_idx].reset_index(drop=True) - pd.to_timedelta(into_bucket, unit='min')
+
+    high = df['high'].to_numpy()
+    low = df['low'].to_numpy()
+    bars = pd.DataFrame({
+        'time': times,
+        'open': df['open'].to_numpy()[first_idx],
+        'high': np.maximum.reduceat(high, first_idx) if n else high[:0],
+        'low': np.minimum.reduceat(low, first_idx) if n else low[:0],
+        'close': df['close'].to_numpy()[last_idx],
+        'volume': np.add.reduceat(df['volume'].to_numpy(), first_idx) if n else df['volume'].to_numpy()[:0],
+    })
+    for col in ('session', 'trading_date', 'is_holiday', 'is_early_close', 'pdh', 'pdl', 'pdc'):
+        if col in df.columns:
+            bars[col] = df[col].iloc[first_idx].reset_index(drop=True)
+
+    bars['atr'] = np.nan_to_num(atr_kernel(bars['high'].to_numpy(), bars['low'].to_numpy(),
+                                           bars['close'].to_numpy(), atr_length), nan=0.0)
+    if 'vwap' in df.columns:
+        bars['vwap'] = df['vwap'].to_numpy()[last_idx]
+
+    bars['first_idx'] = first_idx
+    bars['last_idx'] = last_idx
+    bars.attrs = dict(df.attrs)
+    bars.attrs['timeframe'] = timeframe
+    return bars
+
+
+class BarPyramid:
+    """
+    Higher-timeframe views of the 1m frame, each with index maps back to the 1m rows.
+
+    Typical use:
+        bars = pyramid['15m']
+        events = StructureExtractor(bars).extract_swings()
+        events_1m = pyramid.map_events('15m', events) # confirmed_at in 1m time
+    """
+
+    def __init__(self, base: pd.DataFrame, levels: Dict[str, pd.DataFrame]):
+        self.base = base
+        self.levels = levels
+        self._bar_of_row: Dict[str, np.ndarray] = {}
+
+    @classmethod
+    def build(cls, df: pd.DataFrame, session_starts: Dict[str, int], day_start: int,
+              timeframes: Optional[Dict[str, Optional[int]]] = None, atr_length: int = 14) -> "BarPyramid":
+        timeframes = timeframes if timeframes is not None else DEFAULT_TIMEFRAMES
+        df = df.reset_index(drop=True)
+        levels = {tf: build_bars(df, tf, session_starts, day_start, minutes, atr_length)
+                  for tf, minutes in timeframes.items()}
+        return cls(df, levels)
+
+    def __getitem__(self, timeframe: str) -> pd.DataFrame:
+        return self.levels[timeframe]
+
+    @property
+    def timeframes(self) -> List[str]:
+        return list(self.levels)
+
+    def bar_of_row(self, timeframe: str) -> np.ndarray:
+        """For every 1m row, the position of the higher-timeframe bar containing it."""
+        if timeframe not in self._bar_of_row:
+            bars = self.levels[timeframe]
+            counts = (bars['last_idx'] - bars['first_idx'] + 1).to_numpy()
+            self._bar_of_row[timeframe] = np.repeat(np.arange(len(bars)), counts)
+        return self._bar_of_row[timeframe]
+
+    def confirmation_rows(self, timeframe: str, bar_positions: np.ndarray) -> np.ndarray:
+        """1m row at whose close a higher-timeframe bar (and anything it confirms) is known."""
+        return self.levels[timeframe]['last_idx'].to_numpy()[bar_positions]
+
+    def map_events(self, timeframe: str, events: List[StructureEvent]) -> List[StructureEvent]:
+        """
+        Re-times events extracted on a higher timeframe onto the 1m clock.
+        confirmed_at becomes the 1m bar that closes the confirming HTF bar (no lookahead);
+        start_bar / end_bar become the first 1m bar of their HTF bars.
+        """
+        bars = self.levels[timeframe]
+        htf_times = pd.DatetimeIndex(bars['time'])
+        base_times = self.base['time']
+        first_idx = bars['first_idx'].to_numpy()
+        last_idx = bars['last_idx'].to_numpy()
+
+        def position(ts) -> int:
+            return int(htf_times.searchsorted(pd.Timestamp(ts), side='right') - 1)
+
+        mapped = []
+        for e in events:
+            start_bar = base_times.iloc[first_idx[position(e.start_bar)]]
+            mapped.append(e.model_copy(update={
+                'key': event_key(e.key & ID_KIND_MASK, start_bar), # IDs follow the start bar
+                'start_bar': start_bar,
+                'end_bar': base_times.iloc[first_idx[position(e.end_bar)]],
+                'confirmed_at': base_times.iloc[last_idx[position(e.confirmed_at)]],
+                'metadata': {**e.metadata, 'timeframe': timeframe},
+            }))
+        return mapped
@@ -0,0 +1,302 @@
+import os
+import json
+import shutil
+import hashlib
+from datetime import date, datetime
+from typing import Dict, List, Optional, Any
+
+import numpy as np
+import pandas as pd
+
+# Bump when the on-disk layout changes (not when features change - that is the loader's job)
+STORE_FORMAT_VERSION = 1
+
+
+def file_fingerprint(filepath: str, limit: Optional[int] = None, block_size: int = 1 << 20) -> str:
+    """
+    SHA-256 of the raw file bytes (only the first `limit` bytes if given).
+    Content-addressed: renaming or touching the CSV does not invalidate the cache,
+    editing a single byte does.
+    """
+    h = hashlib.sha256()
+    remaining = limit
+    with open(filepath, 'rb') as f:
+        while remaining is None or remaining > 0:
+            block = f.read(block_size if remaining is None else min(block_size, remaining))
+            if not block:
+                break
+            h.update(block)
+            if remaining is not None:
+                remaining -= len(block)
+    return h.hexdigest()
+
+
+def params_fingerprint(params: Dict[str, Any]) -> str:
+    """Stable hash of a JSON-serialisable parameter dict."""
+    payload = json.dumps(params, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ColumnStore:
+    """
+    Minimal columnar table on disk.
+
+    Layout (one directory per table):
+        meta.json      -> row count, column dtypes/encodings, free-form metadata
+        <column>.bin   -> raw little-endian array, one file per column
+
+    Raw column files (instead of Parquet/Feather) keep us free of a pyarrow dependency
+    and can be memory-mapped directly with np.memmap, so a warm load only pages in
+    what is actually touched.
+    """
+
+    META_FILE = 'meta.json'
+
+    def __init__(self, root: str):
+        self.root = root
+        self._meta = None
+
+    # --- Introspection ---
+
+    def exists(self) -> bool:
+        return os.path.exists(os.path.join(self.root, self.META_FILE))
+
+    @property
+    def meta(self) -> Dict[str, Any]:
+        if self._meta is None:
+            with open(os.path.join(self.root, self.META_FILE), 'r') as f:
+                self._meta = json.load(f)
+        return self._meta
+
+    def __len__(self) -> int:
+        return int(self.meta['n_rows'])
+
+    @property
+    def columns(self) -> List[str]:
+        return [c['name'] for c in self.meta['columns']]
+
+    # --- Write ---
+
+    def write(self, df: pd.DataFrame, metadata: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Persists df atomically: columns are written to a temp directory which is then
+        swapped in, so a crashed run never leaves a half-written table behind.
+        """
+        tmp_root = self.root + '.tmp'
+        if os.path.exists(tmp_root):
+            shutil.rmtree(tmp_root)
+        os.makedirs(tmp_root)
+
+        col_specs = []
+        for name in df.columns:
+            values, spec = self._encode(df[name])
+            spec['name'] = name
+            values.tofile(os.path.join(tmp_root, f"{name}.bin"))
+            col_specs.append(spec)
+
+        meta = {
+            'format_version': STORE_FORMAT_VERSION,
+            'n_rows': int(len(df)),
+            'columns': col_specs,
+            'metadata': metadata or {},
+        }
+        with open(os.path.join(tmp_root, self.META_FILE), 'w') as f:
+            json.dump(meta, f, indent=2, default=str)
+
+        if os.path.exists(self.root):
+            shutil.rmtree(self.root)
+        os.replace(tmp_root, self.root)
+        self._meta = None
+
+    def append(self, df: pd.DataFrame, metadata: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Appends rows in place. Column bytes are appended first and the row count in
+        meta.json is only bumped afterwards, so an interrupted append leaves the table
+        at its previous (valid) length; stale trailing bytes are truncated on the next append.
+        """
+        specs = self.meta['columns']
+        if [c['name'] for c in specs] != list(df.columns):
+            raise ValueError(f"Append columns {list(df.columns)} do not match store columns {self.columns}")
+
+        n = len(self)
+        for spec in specs:
+            values = self._encode_like(df[spec['name']], spec)
+            path = os.path.join(self.root, f"{spec['name']}.bin")
+            with open(path, 'r+b') as f:
+                f.truncate(n * np.dtype(spec['storage_dtype']).itemsize)
+                f.seek(0, os.SEEK_END)
+                f.write(values.tobytes())
+
+        meta = dict(self.meta)
+        meta['n_rows'] = n + int(len(df))
+        if metadata is not None:
+            meta['metadata'] = metadata
+        tmp_meta = os.path.join(self.root, self.META_FILE + '.tmp')
+        with open(tmp_meta, 'w') as f:
+            json.dump(meta, f, indent=2, default=str)
+        os.replace(tmp_meta, os.path.join(self.root, self.META_FILE))
+        self._meta = None
+
+    def copy(self, new_root: str) -> "ColumnStore":
+        """
+        Copies the table (meta.json and column files, not sidecar directories) to a new
+        root, atomically like write(). Plain byte copies rather than hard links, so
+        appending to the copy never changes this table.
+        """
+        tmp_root = new_root + '.tmp'
+        if os.path.exists(tmp_root):
+            shutil.rmtree(tmp_root)
+        os.makedirs(tmp_root)
+        for spec in self.meta['columns']:
+            name = f"{spec['name']}.bin"
+            shutil.copyfile(os.path.join(self.root, name), os.path.join(tmp_root, name))
+        shutil.copyfile(os.path.join(self.root, self.META_FILE), os.path.join(tmp_root, self.META_FILE))
+
+        if os.path.exists(new_root):
+            shutil.rmtree(new_root)
+        os.replace(tmp_root, new_root)
+        return ColumnStore(new_root)
+
+    def move(self, new_root: str) -> None:
+        """Re-keys the table (e.g. after an append changed the source fingerprint)."""
+        if os.path.abspath(new_root) == os.path.abspath(self.root):
+            return
+        if os.path.exists(new_root):
+            shutil.rmtree(new_root)
+        os.replace(self.root, new_root)
+        self.root = new_root
+
+    # --- Read ---
+
+    def read(self, columns: Optional[List[str]] = None, start: int = 0, stop: Optional[int] = None) -> pd.DataFrame:
+        """
+        Loads rows [start, stop) with every column memory-mapped copy-on-write ('c'):
+        callers can mutate the frame freely without ever touching the file.
+        Only the requested byte range of each column file is mapped.
+        """
+        start, stop, _ = slice(start, stop).indices(len(self))
+        stop = max(start, stop)
+        data = {}
+        for spec in self.meta['columns']:
+            if columns is not None and spec['name'] not in columns:
+                continue
+            raw = self._map_column(spec, start, stop)
+            data[spec['name']] = self._decode(raw, spec)
+        return pd.DataFrame(data, copy=False)
+
+    def searchsorted(self, column: str, value: Any, side: str = 'left') -> int:
+        """
+        Row position of `value` in a sorted column (e.g. 'time').
+        Binary search directly on the mapped file: only O(log n) pages are read.
+        """
+        spec = next((c for c in self.meta['columns'] if c['name'] == column), None)
+        if spec is None:
+            raise KeyError(f"Column {column} not in store {self.root}")
+        raw = self._map_column(spec, 0, len(self))
+        return int(np.searchsorted(raw, self._encode_scalar(value, spec), side=side))
+
+    def _map_column(self, spec: Dict[str, Any], start: int, stop: int) -> np.ndarray:
+        dtype = np.dtype(spec['storage_dtype'])
+        path = os.path.join(self.root, f"{spec['name']}.bin")
+        if stop <= start:
+            return np.empty(0, dtype=dtype)
+        # asarray drops the memmap subclass but keeps the mapped buffer
+        return np.asarray(np.memmap(path, dtype=dtype, mode='c', offset=start * dtype.itemsize,
+                                    shape=(stop - start,)))
+
+    # --- Encoding ---
+
+    @staticmethod
+    def _encode(series: pd.Series):
+        """Returns (numpy array to persist, column spec)."""
+        dtype = series.dtype
+
+        if isinstance(dtype, pd.DatetimeTZDtype):
+            # Persist as naive UTC, remember the zone for the round trip
+            naive = series.dt.tz_convert('UTC').dt.tz_localize(None).to_numpy()
+            return naive, {'kind': 'datetime_tz', 'storage_dtype': str(naive.dtype), 'tz': str(dtype.tz)}
+
+        if pd.api.types.is_datetime64_dtype(dtype):
+            values = series.to_numpy()
+            return values, {'kind': 'datetime', 'storage_dtype': str(values.dtype)}
+
+        if pd.api.types.is_timedelta64_dtype(dtype):
+            values = series.to_numpy()
+            return values, {'kind': 'timedelta', 'storage_dtype': str(values.dtype)}
+
+        if isinstance(dtype, pd.CategoricalDtype):
+            codes = series.cat.codes.to_numpy()
+            return codes, {'kind': 'categorical', 'storage_dtype': str(codes.dtype),
+                           'categories': [str(c) for c in dtype.categories]}
+
+        if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_numeric_dtype(dtype):
+            values = series.to_numpy()
+            return values, {'kind': 'numeric', 'storage_dtype': str(values.dtype)}
+
+        # Object-like columns: python dates or repeated strings (session labels)
+        sample = series.dropna()
+        first = sample.iloc[0] if len(sample) else None
+        if isinstance(first, date) and not isinstance(first, datetime):
+            values = np.asarray(series.to_numpy(), dtype='datetime64[D]')
+            return values, {'kind': 'date', 'storage_dtype': str(values.dtype)}
+
+        codes, uniques = pd.factorize(series, use_na_sentinel=True)
+        codes = codes.astype(np.int16 if len(uniques) > 127 else np.int8)
+        return codes, {'kind': 'labels', 'storage_dtype': str(codes.dtype),
+                       'categories': [str(u) for u in uniques]}
+
+    def _encode_like(self, series: pd.Series, spec: Dict[str, Any]) -> np.ndarray:
+        """Encodes new rows with an existing column's encoding (extending label sets in place)."""
+        values, new_spec = self._encode(series)
+        kind = spec['kind']
+        if new_spec['kind'] != kind and not (kind == 'labels' and len(series) == 0):
+            raise ValueError(f"Column {spec['name']}: cannot append {new_spec['kind']} to {kind}")
+
+        if kind in ('labels', 'categorical'):
+            if kind == 'categorical' and new_spec['categories'] != spec['categories']:
+                raise ValueError(f"Column {spec['name']}: categories changed")
+            if kind == 'labels':
+                categories = spec['categories']
+                remap = []
+                for label in new_spec.get('categories', []):
+                    if label not in categories:
+                        categories.append(label)
+                    remap.append(categories.index(label))
+                if len(categories) > np.iinfo(np.dtype(spec['storage_dtype'])).max:
+                    raise ValueError(f"Column {spec['name']}: too many labels for {spec['storage_dtype']} codes")
+                remap = np.array(remap + [-1], dtype=np.int64)
+                values = remap[values.astype(np.int64)]
+        return np.asarray(values).astype(spec['storage_dtype'], casting='same_kind')
+
+    @staticmethod
+    def _encode_scalar(value: Any, spec: Dict[str, Any]):
+        """Encodes a single lookup value the way the column is stored."""
+        dtype = np.dtype(spec['storage_dtype'])
+        kind = spec['kind']
+        if kind == 'datetime_tz':
+            ts = pd.Timestamp(value)
+            # Naive lookups are wall-clock times in the column's own zone
+            ts = ts.tz_localize(spec['tz']) if ts.tzinfo is None else ts
+            return ts.tz_convert('UTC').tz_localize(None).to_datetime64().astype(dtype)
+        if kind in ('datetime', 'date'):
+            return pd.Timestamp(value).to_datetime64().astype(dtype)
+        if kind == 'timedelta':
+            return pd.Timedelta(value).to_timedelta64().astype(dtype)
+        if kind == 'numeric':
+            return np.asarray(value).astype(dtype)
+        raise ValueError(f"Column {spec['name']}: cannot search a {kind} column")
+
+    @staticmethod
+    def _decode(raw: np.ndarray, spec: Dict[str, Any]):
+        kind = spec['kind']
+        if kind == 'datetime_tz':
+            return pd.Series(pd.DatetimeIndex(raw).tz_localize('UTC').tz_convert(spec['tz']))
+        if kind == 'date':
+            return raw.astype(object)
+        if kind == 'categorical':
+            return pd.Categorical.from_codes(np.asarray(raw), categories=spec['categories'])
+        if kind == 'labels':
+            lookup = np.array(spec['categories'] + [None], dtype=object)
+            # -1 (missing) indexes the trailing None
+            return pd.Series(lookup[np.asarray(raw)])
+        return raw
@@ -1,8 +1,12 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Mapping, Optional, Tuple
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 from schema import MarketState, Hypothesis, StructureEvent, EventType, Regime, Session, Direction
+from events import EventTable
+from state_graph import StateStore
+from gap_index import GapIndex
+from range_index import RangeIndex
 
 class HypothesisEngine:
     """
@@ -10,18 +14,35 @@ class HypothesisEngine:
     Scans the MarketState graph and tests a specific Hypothesis.
     """
     
-    def __init__(self, states: Dict[datetime, MarketState], df: pd.DataFrame):
+    def __init__(self, states: Mapping[datetime, MarketState], df: pd.DataFrame, gaps: Optional[GapIndex] = None,
+                 events: Optional[EventTable] = None):
         self.states = states
         # Convert df to dictionary for O(1) price lookup by timestamp if needed, 
         # or just rely on state if it carries price. 
         # Currently State doesn't carry OHLC explicitly, only context.
         # We need OHLC to check outcomes (Expansion / Invalidation).
         
+        # Prices stay in the frame's own units (ticks for a compact frame): every outcome
+        # is expressed in R multiples, so the unit cancels out.
         self.price_lookup = df.set_index('time')[['open', 'high', 'low', 'close', 'atr']].to_dict('index')
         self.sorted_times = sorted(states.keys())
         
         # Build map from time -> index for fast forward scanning
         self.time_to_idx = {t: i for i, t in enumerate(self.sorted_times)}
+        # Range max / min over the bars in state order: forward scans become first-hit queries
+        # (.loc: a state without a bar is a KeyError, as the per-bar price_lookup was)
+        self.ranges = RangeIndex.from_frame(df.set_index('time').loc[self.sorted_times])
+
+        # Data gaps (weekends, halts, missing bars) by bar position, for forward scans.
+        # Pass DataLoader.gap_index when df is the loader's full frame; positions must match df.
+        self.gaps = gaps if gaps is not None else GapIndex.from_frame(df.sort_values('time').reset_index(drop=True))
+
+        # Optional columnar copy of the events behind the states: lets run() visit only the
+        # bars where a trigger of the right type ends instead of every state
+        # (a StateStore already holds the table it was built from)
+        if events is None and isinstance(states, StateStore):
+            events = states.events
+        self.events = events
 
     def run(self, hypothesis: Hypothesis, mode: str = "NORMAL", random_seed: int = 42) -> pd.DataFrame:
         """
@@ -32,10 +53,11 @@ class HypothesisEngine:
         random.seed(random_seed)
         
         results = []
+        trades = [] # (time, state, trigger, direction) of every fired trigger
         
         print(f"Testing Hypothesis {hypothesis.id} | Mode: {mode}")
         
-        for t in self.sorted_times:
+        for t in self._candidate_times(hypothesis):
             state = self.states[t]
             
             # 1. Check Pre-Conditions
@@ -66,31 +88,46 @@ class HypothesisEngine:
                 # Override with coin flip
                 trade_direction = random.choice([Direction.BULLISH, Direction.BEARISH])
                 
-            # 3. Simulate Outcome
-            outcome = self._simulate_outcome(t, hypothesis, trigger_event, trade_direction)
-            if outcome:
-                outcome['trigger_time'] = t
-                outcome['session'] = state.session.value if hasattr(state.session, 'value') else state.session
-                outcome['regime'] = state.regime.value if hasattr(state.regime, 'value') else state.regime
-                outcome['mode'] = mode
-                
-                # Enhanced Context for Loss Analysis
-                if trigger_event.event_type == EventType.LIQUIDITY_SWEEP:
-                    outcome['sweep_depth'] = getattr(trigger_event, 'sweep_depth', 0)
-                    outcome['is_major'] = getattr(trigger_event, 'is_major', False)
-                else:
-                    outcome['sweep_depth'] = 0
-                    outcome['is_major'] = False
-                    
-                # Context Tags
-                if trigger_event.context:
-                    outcome['vwap_dist'] = trigger_event.context.distance_to_vwap_std
-                    outcome['time_of_day'] = trigger_event.context.time_of_day
-                    
-                results.append(outcome)
-                
+            trades.append((t, state, trigger_event, trade_direction))
+
+        # 3. Simulate Outcomes (all trades at once)
+        outcomes = self._simulate_outcomes(
+            [self._trade_levels(t, hypothesis, e, d) for t, _, e, d in trades], hypothesis)
+        for (t, state, trigger_event, _), outcome in zip(trades, outcomes):
+            outcome['trigger_time'] = t
+            outcome['session'] = state.session.value if hasattr(state.session, 'value') else state.session
+            outcome['regime'] = state.regime.value if hasattr(state.regime, 'value') else state.regime
+            outcome['mode'] = mode
+
+            # Enhanced Context for Loss Analysis
+            if trigger_event.event_type == EventType.LIQUIDITY_SWEEP:
+                outcome['sweep_depth'] = getattr(trigger_event, 'sweep_depth', 0)
+                outcome['is_major'] = getattr(trigger_event, 'is_major', False)
+            else:
+                outcome['sweep_depth'] = 0
+                outcome['is_major'] = False
+
+            # Context Tags
+            if trigger_event.context:
+                outcome['vwap_dist'] = trigger_event.context.distance_to_vwap_std
+                outcome['time_of_day'] = trigger_event.context.time_of_day
+
+            results.append(outcome)
+
         return pd.DataFrame(results)
 
+    def _candidate_times(self, hypothesis: Hypothesis) -> List[datetime]:
+        """
+        States that can fire: without an event table, all of them. With one, only the
+        bars where an event of the trigger type ends (a superset of the actual triggers;
+        each is still checked against the state exactly as before).
+        """
+        if self.events is None:
+            return self.sorted_times
+        mask = self.events.of_type(hypothesis.trigger.event_type)
+        ends = self.events.times[np.unique(self.events['end_idx'][mask])]
+        return sorted((t for t in ends if t in self.time_to_idx), key=self.time_to_idx.__getitem__)
+
     def _check_conditions(self, state: MarketState, conditions: List[Any]) -> bool:
         # ... (Unchanged)
         for cond in conditions:
@@ -121,6 +158,11 @@ class HypothesisEngine:
         Forward tests from start_time.
         direction: The explicit direction to trade (Standard or Random).
         """
+        return self._simulate_outcomes([self._trade_levels(start_time, hypothesis, trigger, direction)], hypothesis)[0]
+
+    def _trade_levels(self, start_time: datetime, hypothesis: Hypothesis, trigger: StructureEvent,
+                      direction: Direction) -> Tuple[int, bool, float, float]:
+        """(start_idx, is_long, stop_price, target_price) of a trade entered at start_time's close."""
         start_idx = self.time_to_idx[start_time]
         
         # Initial params
@@ -215,63 +257,66 @@ class HypothesisEngine:
         else:
             # Default for other setups
             inval_price = self.price_lookup[start_time]['low'] if is_long else self.price_lookup[start_time]['high']
-        
-        # Scan forward
+
+        return start_idx, is_long, stop_price, target_price
+
+    def _simulate_outcomes(self, trades: List[Tuple[int, bool, float, float]], hypothesis: Hypothesis) -> List[Dict]:
+        """
+        Forward tests many trades at once (see _trade_levels). Each bar after entry is
+        checked stop first (close through the stop), then target (wick reaches it), for
+        up to within_bars bars: the first stop bar and the first target bar are each one
+        RangeIndex.first_hit query, so no trade walks its bars in Python.
+        """
+        if not trades:
+            return []
+        start_idx, is_long, stop_price, target_price = (np.array(c) for c in zip(*trades))
+        n = len(self.sorted_times)
         max_duration = hypothesis.expectation.within_bars
-        
-        for i in range(1, max_duration + 1):
-            curr_idx = start_idx + i
-            if curr_idx >= len(self.sorted_times):
-                break
-            
-            curr_time = self.sorted_times[curr_idx]
-            bar = self.price_lookup[curr_time]
-            
-            # Check Invalidation / Stop
-            if is_long:
-                if bar['close'] < stop_price: # Stop hit
-                    return {
-                        "result": "LOSS",
-                        "pnl_r": -1.0, 
-                        "bars_held": i,
-                        "exit_reason": "INVALIDATION"
-                    }
-                # Check Target
-                if bar['high'] >= target_price:
-                    return {
-                        "result": "WIN",
-                        "pnl_r": hypothesis.expectation.min_value,
-                        "bars_held": i,
-                        "exit_reason": "TARGET_MET"
-                    }
-            else: # Short
-                if bar['close'] > stop_price:
-                    return {
-                        "result": "LOSS",
-                        "pnl_r": -1.0,
-                        "bars_held": i,
-                        "exit_reason": "INVALIDATION"
-                    }
-                if bar['low'] <= target_price:
-                    return {
-                        "result": "WIN",
-                        "pnl_r": hypothesis.expectation.min_value,
-                        "bars_held": i,
-                        "exit_reason": "TARGET_MET"
-                    }
-        
-        # If time runs out
-        return {
-            "result": "TIMEOUT",
-            "pnl_r": 0.0, # Or actual floating PnL
-            "bars_held": max_duration,
-            "exit_reason": "TIME_EXPIRED"
-        }
+        first = start_idx + 1
+        end = np.minimum(start_idx + max_duration + 1, n) # Scan bars first..end-1
+
+        stop_bar = np.empty(len(first), dtype=np.int64)
+        target_bar = np.empty(len(first), dtype=np.int64)
+        for side, close_mode, breaks, wick, wick_mode, reaches in (
+            (np.flatnonzero(is_long), 'min', np.less, 'high', 'max', np.greater_equal),
+            (np.flatnonzero(~is_long), 'max', np.greater, 'low', 'min', np.less_equal),
+        ):
+            stop_bar[side] = self.ranges.first_hit('close', close_mode, first[side], end[side], stop_price[side], breaks)
+            target_bar[side] = self.ranges.first_hit(wick, wick_mode, first[side], end[side], target_price[side], reaches)
+
+        outcomes = []
+        for i, start in enumerate(start_idx.tolist()):
+            # First data gap ahead of the trigger bar: a trade is flagged once the scan steps past it
+            gap_at = self.gaps.next_gap(start)
+            if gap_at is None:
+                gap_at = n
+
+            # Stop is checked before target on the same bar
+            exit_bar = int(min(stop_bar[i], target_bar[i]))
+            if exit_bar < end[i]:
+                loss = stop_bar[i] <= target_bar[i]
+                outcomes.append({
+                    "result": "LOSS" if loss else "WIN",
+                    "pnl_r": -1.0 if loss else hypothesis.expectation.min_value,
+                    "bars_held": exit_bar - start,
+                    "exit_reason": "INVALIDATION" if loss else "TARGET_MET",
+                    "crossed_gap": gap_at < exit_bar
+                })
+            else:
+                # If time runs out
+                outcomes.append({
+                    "result": "TIMEOUT",
+                    "pnl_r": 0.0, # Or actual floating PnL
+                    "bars_held": max_duration,
+                    "exit_reason": "TIME_EXPIRED",
+                    "crossed_gap": gap_at < min(start + max_duration, n - 1)
+                })
+        return outcomes
 
 if __name__ == "__main__":
     # Integration Test
     from data_loader import DataLoader
-    from structure import StructureExtractor
+    from structure_cache import StructureCache
     from state_graph import StateBuilder
     from schema import Condition, Trigger, ResultExpectation, InvalidationCriteria
     
@@ -282,13 +327,15 @@ if __name__ == "__main__":
     
     # ... (previous setup)
     print("Extracting Structure...")
-    extractor = StructureExtractor(df)
-    events = []
-    swings = extractor.extract_swings() # Need reference to swings for sweep extraction
-    events.extend(swings)
-    events.extend(extractor.extract_compressions())
-    events.extend(extractor.extract_displacements())
-    events.extend(extractor.extract_sweeps(swings, min_reclaim_pts=0.25)) # Add Sweeps
+    # Served from the structure cache when neither the data nor the parameters changed
+    structure = StructureCache(loader)
+    events = EventTable.concat([
+        structure.swings(),
+        structure.compressions(),
+        structure.displacements(),
+        structure.sweeps(min_reclaim_pts=0.25), # Add Sweeps
+    ])
+    print(f"Structure cache: {structure.stats}")
     
     print("Building States...")
     builder = StateBuilder(df, events)
@@ -305,7 +352,7 @@ if __name__ == "__main__":
     )
     print("Applied Filter: Trigger.is_major == True")
     
-    engine = HypothesisEngine(states, df)
+    engine = HypothesisEngine(states, df, gaps=loader.gap_index, events=events)
     
     # 1. Real Strategy Run (Major Only)
     print("\n--- [RUN 1] Kaizen Reversal (Major Only) ---")
@@ -0,0 +1,377 @@
+from typing import Dict, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from schema import (
+    StructureEvent, SwingEvent, CompressionEvent, DisplacementEvent, LiquiditySweepEvent,
+    FVGEvent, SessionSweepEvent, FailedBreakoutEvent, EventType, Direction, Regime, ID_KIND_BITS, context_tags, id_kind
+)
+
+# Enum <-> int8 codes (code = position in the enum)
+EVENT_TYPES: List[EventType] = list(EventType)
+DIRECTIONS: List[Direction] = list(Direction)
+REGIMES: List[Regime] = list(Regime)
+EVENT_CODES = {e: i for i, e in enumerate(EVENT_TYPES)}
+DIRECTION_CODES = {d: i for i, d in enumerate(DIRECTIONS)}
+REGIME_CODES = {r: i for i, r in enumerate(REGIMES)}
+
+# Column -> dtype. Rows are positions in the source frame; prices are in points.
+# Type-specific meaning of the shared columns:
+#   price_level : swing level | swept level (sweeps) | closing price (displacement)
+#                 | gap high (FVG) | broken level (failed breakout)
+#   level_low   : gap low (FVG)
+#   magnitude   : ATR multiple (displacement, FVG) | compression ratio | sweep depth (points)
+#   swing_idx   : row of the swept swing's pivot bar (sweep) | row of the session extreme
+#                 (session sweep, failed breakout)
+COLUMNS: Dict[str, np.dtype] = {
+    'event_type': np.dtype(np.int8),
+    'direction': np.dtype(np.int8),
+    'regime': np.dtype(np.int8),        # Context regime at the event
+    'start_idx': np.dtype(np.int64),
+    'end_idx': np.dtype(np.int64),      # Also the context row (session, time of day)
+    'confirmed_idx': np.dtype(np.int64),
+    'confidence': np.dtype(np.float64),
+    'vwap_dist': np.dtype(np.float64),  # Context distance_to_vwap_std
+    'price_level': np.dtype(np.float64),
+    'level_low': np.dtype(np.float64),
+    'is_major': np.dtype(bool),
+    'magnitude': np.dtype(np.float64),
+    'bar_count': np.dtype(np.int64),
+    'average_true_range': np.dtype(np.float64),
+    'volume_z_score': np.dtype(np.float64),
+    'swing_idx': np.dtype(np.int64),
+    'tested_count': np.dtype(np.int64),
+    'reclaim_time_bars': np.dtype(np.int64),
+}
+
+_FILL = {'i': -1, 'f': np.nan, 'b': False}
+
+# Every field is set on a built model, so all instances of a class share one fields_set
+# (pydantic only ever adds names to it, and they are all there already)
+_FIELDS_SET = {cls: set(cls.model_fields)
+               for cls in (StructureEvent, SwingEvent, CompressionEvent, DisplacementEvent, LiquiditySweepEvent,
+                           FVGEvent, SessionSweepEvent, FailedBreakoutEvent)}
+
+# (event_type code, direction code) -> id kind (see schema.event_key)
+_ID_KIND_CODES = np.array([[id_kind(e, d) for d in DIRECTIONS] for e in EVENT_TYPES], dtype=np.int64)
+
+
+class EventTable:
+    """
+    Struct-of-arrays store for structure events: one typed NumPy column per field
+    (see COLUMNS) instead of one pydantic model per event.
+
+    Filtering, sorting and grouping run on the columns. Schema models are only built
+    for the rows a caller actually touches (table[i], iteration, to_events) and are
+    then cached on the table.
+
+    `times` are the timestamps of the source frame rows and `context` its per-bar
+    context arrays (session, time_of_day, day_of_week - see StructureExtractor),
+    both needed to materialize models.
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray], times: pd.Series, context: Optional[Dict[str, Sequence]] = None,
+                 models: Optional[np.ndarray] = None):
+        self.columns = columns
+        self.times = pd.DatetimeIndex(times)
+        self.context = context
+        self._models = models # Object array of materialized models (None = not built yet)
+        self._seconds = None  # Bar times in epoch seconds for the keys (built on first use)
+
+    @classmethod
+    def build(cls, times: pd.Series, context: Optional[Dict[str, Sequence]], n: int, **columns) -> "EventTable":
+        """Table of n rows; columns not given are filled with -1 / NaN / False."""
+        data = {}
+        for name, dtype in COLUMNS.items():
+            if name in columns:
+                values = np.asarray(columns.pop(name))
+                data[name] = np.broadcast_to(values, (n,)).astype(dtype) if values.ndim == 0 else values.astype(dtype)
+            else:
+                data[name] = np.full(n, _FILL[dtype.kind], dtype=dtype)
+        if columns:
+            raise KeyError(f"Unknown EventTable columns: {list(columns)}")
+        return cls(data, times, context)
+
+    @classmethod
+    def empty(cls, times: pd.Series, context: Optional[Dict[str, Sequence]] = None) -> "EventTable":
+        return cls.build(times, context, 0)
+
+    @classmethod
+    def from_events(cls, events: List[StructureEvent], times: pd.Series) -> "EventTable":
+        """Columnar copy of existing models (which are kept, so nothing is rebuilt)."""
+        index = pd.DatetimeIndex(times)
+
+        def rows(values) -> np.ndarray:
+            return index.get_indexer(pd.DatetimeIndex(values)) if len(values) else np.zeros(0, dtype=np.int64)
+
+        # Field dicts (pydantic keeps fields in __dict__); getattr on a missing field is slow
+        fields = [vars(e) for e in events]
+
+        def field(name, default):
+            return [f.get(name, default) for f in fields]
+
+        # Sweeps point at their swing by key (bar open in the key's high bits)
+        swing_bars = pd.to_datetime([k >> ID_KIND_BITS if k is not None else None
+                                     for k in field('swing_key', None)], unit='s', utc=True)
+        price = [f.get('price_level', f.get('swept_level', f.get('closing_price', f.get('gap_high', f.get('level_price', np.nan)))))
+                 for f in fields]
+        magnitude = [f.get('magnitude_atr', f.get('compression_ratio', f.get('sweep_depth', f.get('gap_atr', np.nan))))
+                     for f in fields]
+        table = cls.build(
+            times, None, len(events),
+            event_type=[EVENT_CODES[e.event_type] for e in events],
+            direction=[DIRECTION_CODES[e.direction] for e in events],
+            regime=[REGIME_CODES[e.context.regime] for e in events],
+            start_idx=rows([e.start_bar for e in events]),
+            end_idx=rows([e.end_bar for e in events]),
+            confirmed_idx=rows([e.confirmed_at for e in events]),
+            confidence=field('confidence_score', np.nan),
+            vwap_dist=[e.context.distance_to_vwap_std for e in events],
+            price_level=price,
+            level_low=field('gap_low', np.nan),
+            is_major=field('is_major', False),
+            magnitude=magnitude,
+            bar_count=field('bar_count', -1),
+            average_true_range=field('average_true_range', np.nan),
+            volume_z_score=field('volume_z_score', np.nan),
+            tested_count=field('tested_count', -1),
+            reclaim_time_bars=field('reclaim_time_bars', -1),
+            swing_idx=rows(swing_bars),
+        )
+        table._models = np.empty(len(events), dtype=object)
+        table._models[:] = events
+        return table
+
+    @classmethod
+    def concat(cls, tables: List["EventTable"]) -> "EventTable":
+        """Stacks tables built on the same frame (row order is kept)."""
+        if not tables:
+            raise ValueError("concat needs at least one table")
+        first = tables[0]
+        columns = {name: np.concatenate([t.columns[name] for t in tables]) for name in COLUMNS}
+        models = None
+        if any(t._models is not None for t in tables):
+            models = np.concatenate([t._models if t._models is not None else np.full(len(t), None, dtype=object)
+                                     for t in tables])
+        context = next((t.context for t in tables if t.context is not None), first.context)
+        return cls(columns, first.times, context, models)
+
+    # --- Columnar access ---
+
+    def __len__(self) -> int:
+        return len(self.columns['event_type'])
+
+    def __getitem__(self, key: Union[int, str, slice, np.ndarray]):
+        """table['col'] -> column, table[i] -> model, table[mask | rows | slice] -> sub-table."""
+        if isinstance(key, str):
+            return self.columns[key]
+        if isinstance(key, (int, np.integer)):
+            i = int(key) + (len(self) if key < 0 else 0)
+            return self._materialize(np.array([i]))[0]
+        return self.take(np.arange(len(self))[key])
+
+    def __iter__(self) -> Iterator[StructureEvent]:
+        # Materialize in blocks: lazy, but without per-row overhead
+        for start in range(0, len(self), 4096):
+            yield from self._materialize(np.arange(start, min(start + 4096, len(self))))
+
+    def take(self, rows: np.ndarray) -> "EventTable":
+        """Subset by row positions or by a boolean mask (e.g. of_type(...))."""
+        rows = np.asarray(rows)
+        if rows.dtype == bool:
+            if len(rows) != len(self):
+                raise ValueError(f"Mask of length {len(rows)} for a table of {len(self)} rows")
+            rows = np.flatnonzero(rows)
+        rows = rows.astype(np.int64, copy=False)
+        columns = {name: values[rows] for name, values in self.columns.items()}
+        models = self._models[rows] if self._models is not None else None
+        table = EventTable(columns, self.times, self.context, models)
+        table._seconds = self._seconds # Same frame, same bar times
+        return table
+
+    def sort(self, by: str = 'confirmed_idx') -> "EventTable":
+        """Stable sort on a column (ties keep their current order)."""
+        return self.take(np.argsort(self.columns[by], kind='stable'))
+
+    def of_type(self, *event_types: EventType) -> np.ndarray:
+        """Boolean mask of rows whose event_type is one of event_types."""
+        return np.isin(self.columns['event_type'], [EVENT_CODES[e] for e in event_types])
+
+    def times_of(self, column: str = 'confirmed_idx') -> pd.DatetimeIndex:
+        """Timestamps of a row-position column (start_idx, end_idx, confirmed_idx, swing_idx)."""
+        return self.times[self.columns[column]]
+
+    def keys(self) -> np.ndarray:
+        """Integer event keys (schema.event_key) straight from the columns, no models built."""
+        return self._keys(self.columns)
+
+    def _keys(self, c: Dict[str, np.ndarray]) -> np.ndarray:
+        kind = _ID_KIND_CODES[c['event_type'], c['direction']]
+        return (self._bar_seconds()[c['start_idx']] << ID_KIND_BITS) | kind
+
+    def _swing_keys(self, c: Dict[str, np.ndarray]) -> np.ndarray:
+        """Key of the swept swing (bearish sweep = a swing high was raided); -1 if none."""
+        kind = np.where(c['direction'] == DIRECTION_CODES[Direction.BEARISH],
+                        id_kind(EventType.SWING_HIGH, Direction.BEARISH), id_kind(EventType.SWING_LOW, Direction.BULLISH))
+        seconds = self._bar_seconds()[np.maximum(c['swing_idx'], 0)] if len(self.times) else c['swing_idx']
+        return np.where(c['swing_idx'] >= 0, (seconds << ID_KIND_BITS) | kind, -1)
+
+    def _bar_seconds(self) -> np.ndarray:
+        # Once per table: models are built a few rows at a time (e.g. a StateStore walked bar by bar)
+        if self._seconds is None:
+            self._seconds = self.times.as_unit('ns').asi8 // 10**9
+        return self._seconds
+
+    def to_frame(self) -> pd.DataFrame:
+        """Flat DataFrame view (enums decoded) for analysis."""
+        df = pd.DataFrame(self.columns, copy=False)
+        df['event_type'] = np.array([e.value for e in EVENT_TYPES], dtype=object)[df['event_type']]
+        df['direction'] = np.array([d.value for d in DIRECTIONS], dtype=object)[df['direction']]
+        df['regime'] = np.array([r.value for r in REGIMES], dtype=object)[df['regime']]
+        df['confirmed_at'] = self.times_of('confirmed_idx')
+        return df
+
+    # --- Materialization ---
+
+    def to_events(self, rows: Optional[np.ndarray] = None) -> List[StructureEvent]:
+        """Schema models for `rows` (default: all), in row order."""
+        rows = np.arange(len(self)) if rows is None else np.asarray(rows, dtype=np.int64)
+        return self._materialize(rows)
+
+    def _materialize(self, rows: np.ndarray) -> List[StructureEvent]:
+        if self._models is None:
+            self._models = np.full(len(self), None, dtype=object)
+        missing = [r for r in rows.tolist() if self._models[r] is None]
+        if missing:
+            missing = np.array(missing, dtype=np.int64)
+            built = self._build_models(missing)
+            for r, model in zip(missing.tolist(), built):
+                self._models[r] = model
+        return list(self._models[rows])
+
+    def _build_models(self, rows: np.ndarray) -> List[StructureEvent]:
+        if self.context is None:
+            raise ValueError("EventTable has no frame context to build models from.")
+        c = {name: values[rows] for name, values in self.columns.items()}
+        # One Timestamp object per frame row, shared by every event (and field) that points at it
+        bars = np.unique(np.r_[c['start_idx'], c['end_idx'], c['confirmed_idx']])
+        stamp = dict(zip(bars.tolist(), self.times[bars])) if len(bars) else {}
+        start = [stamp[r] for r in c['start_idx'].tolist()]
+        end = [stamp[r] for r in c['end_idx'].tolist()]
+        confirmed = [stamp[r] for r in c['confirmed_idx'].tolist()]
+        keys = self._keys(c).tolist()
+        swing_keys = self._swing_keys(c).tolist()
+        end_rows = c['end_idx'].tolist()
+        swing_rows = c['swing_idx'].tolist()
+        session, clock, dow = self.context['session'], self.context['time_of_day'], self.context['day_of_week']
+        plain = {name: values.tolist() for name, values in c.items()}
+
+        models = []
+        for k in range(len(rows)):
+            etype = EVENT_TYPES[plain['event_type'][k]]
+            ctx_row = end_rows[k]
+            # Fields are already typed, so skip pydantic validation (same models, ~10x cheaper)
+            context = context_tags(session[ctx_row], REGIMES[plain['regime'][k]], clock[ctx_row], dow[ctx_row],
+                                   plain['vwap_dist'][k], validate=False)
+            common = dict(
+                key=keys[k],
+                event_type=etype,
+                start_bar=start[k],
+                end_bar=end[k],
+                confirmed_at=confirmed[k],
+                direction=DIRECTIONS[plain['direction'][k]],
+                confidence_score=plain['confidence'][k],
+                context=context,
+                metadata={}, # Explicit: model_construct resolving default factories is slow
+            )
+
+            if etype in (EventType.SWING_HIGH, EventType.SWING_LOW):
+                models.append(SwingEvent.model_construct(_FIELDS_SET[SwingEvent],
+                    price_level=plain['price_level'][k],
+                    is_major=plain['is_major'][k],
+                    tested_count=plain['tested_count'][k],
+                    **common))
+            elif etype == EventType.COMPRESSION:
+                models.append(CompressionEvent.model_construct(_FIELDS_SET[CompressionEvent],
+                    bar_count=plain['bar_count'][k],
+                    average_true_range=plain['average_true_range'][k],
+                    compression_ratio=plain['magnitude'][k],
+                    **common))
+            elif etype == EventType.DISPLACEMENT:
+                models.append(DisplacementEvent.model_construct(_FIELDS_SET[DisplacementEvent],
+                    magnitude_atr=plain['magnitude'][k],
+                    volume_z_score=plain['volume_z_score'][k],
+                    closing_price=plain['price_level'][k],
+                    **common))
+            elif etype == EventType.LIQUIDITY_SWEEP:
+                models.append(LiquiditySweepEvent.model_construct(_FIELDS_SET[LiquiditySweepEvent],
+                    swept_level=plain['price_level'][k],
+                    sweep_depth=plain['magnitude'][k],
+                    swing_key=swing_keys[k],
+                    is_major=plain['is_major'][k],
+                    reclaim_time_bars=plain['reclaim_time_bars'][k],
+                    **common))
+            elif etype == EventType.FVG:
+                models.append(FVGEvent.model_construct(_FIELDS_SET[FVGEvent],
+                    gap_high=plain['price_level'][k],
+                    gap_low=plain['level_low'][k],
+                    gap_atr=plain['magnitude'][k],
+                    **common))
+            elif etype in (EventType.SESSION_HIGH_SWEEP, EventType.SESSION_LOW_SWEEP):
+                models.append(SessionSweepEvent.model_construct(_FIELDS_SET[SessionSweepEvent],
+                    swept_level=plain['price_level'][k],
+                    sweep_depth=plain['magnitude'][k],
+                    swept_session=session[swing_rows[k]],
+                    **common))
+            elif etype == EventType.FAILED_BREAKOUT:
+                bars = plain['reclaim_time_bars'][k]
+                models.append(FailedBreakoutEvent.model_construct(_FIELDS_SET[FailedBreakoutEvent],
+                    level_price=plain['price_level'][k],
+                    failure_mode="IMMEDIATE_REVERSAL" if bars <= 1 else "GRIND_BACK",
+                    reclaim_time_bars=bars,
+                    **common))
+            else:
+                models.append(StructureEvent.model_construct(_FIELDS_SET[StructureEvent], **common))
+        return models
+
+
+if __name__ == "__main__":
+    # Memory of materialized models: integer keys (string IDs on demand) and shared ContextTags
+    import gc
+    import tracemalloc
+    from data_loader import DataLoader
+    from structure import StructureExtractor
+
+    loader = DataLoader(r"C:\Users\CEO\.gemini\antigravity\scratch\kaizen_1m_data_ibkr_2yr.csv")
+    extractor = StructureExtractor(loader.load_and_process())
+    swing_table = extractor.swing_table()
+    sweep_table = extractor.sweep_table(swing_table, min_reclaim_pts=0.25)
+
+    gc.collect()
+    tracemalloc.start()
+    events = swing_table.to_events() + sweep_table.to_events()
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # Baseline: the same events stored the way they were before integer keys - a validated
+    # model per event with its own ContextTags and timestamps, plus the formatted string ids
+    def per_event(e: StructureEvent):
+        fields = e.model_dump()
+        ids = (fields.pop('id'), fields.pop('swing_id', None))
+        for name in ('start_bar', 'end_bar', 'confirmed_at'):
+            fields[name] = fields[name].to_pydatetime()
+        return type(e)(**fields), ids
+
+    gc.collect()
+    tracemalloc.start()
+    baseline = [per_event(e) for e in events]
+    held_before, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    for label, size, contexts in (
+            ('string ids, one ContextTags per event', held_before, len({id(m.context) for m, _ in baseline})),
+            ('integer keys, shared ContextTags', held, len({id(e.context) for e in events}))):
+        print(f"{len(events)} swings + sweeps, {label}: {size / 2**20:.1f} MiB "
+              f"({size / max(len(events), 1):.0f} B/event), {contexts} distinct ContextTags")
+    print(f"Example: key {events[0].key} -> {events[0].id}")
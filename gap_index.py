@@ -0,0 +1,127 @@
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from session_calendar import MINUTES_PER_DAY, local_minutes
+
+# Gap classification
+GAP_WEEKEND = "WEEKEND"
+GAP_HOLIDAY = "HOLIDAY"
+GAP_SESSION_BREAK = "SESSION_BREAK" # Daily 17:00 - 18:00 ET maintenance halt
+GAP_MISSING = "MISSING DATA"        # Intraday hole: genuinely missing bars
+
+
+class GapIndex:
+    """
+    Vectorized index of discontinuities in the 1-minute sequence.
+    Rule 9: 'Missing data must be flagged, logged, and preserved.'
+
+    One row per gap:
+        start_pos / end_pos : row positions of the bars on either side (end_pos = start_pos + 1)
+        start / end         : their timestamps
+        duration            : end - start
+        type                : WEEKEND, HOLIDAY, SESSION_BREAK or MISSING DATA
+
+    Positions refer to the (time-sorted) frame the index was built from.
+    """
+
+    # Standard gap is 1m. Allow a small buffer for drift: any jump > 1m30s is a gap.
+    GAP_THRESHOLD = pd.Timedelta(minutes=1, seconds=30)
+    SESSION_BREAK_END = 18 * 60 # Globex reopens at 18:00 ET
+    MAX_SESSION_BREAK = pd.Timedelta(hours=2)
+
+    def __init__(self, table: pd.DataFrame):
+        self.table = table.reset_index(drop=True)
+        self._start_pos = self.table['start_pos'].to_numpy(dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "GapIndex":
+        """
+        Builds the index from a processed frame (needs 'time'; uses 'trading_date',
+        'is_holiday' and 'is_early_close' when present).
+        """
+        times = df['time']
+        t = times.to_numpy()
+        if len(t) < 2:
+            return cls(cls._empty())
+
+        delta = t[1:] - t[:-1]
+        start_pos = np.flatnonzero(delta > cls.GAP_THRESHOLD.to_timedelta64()).astype(np.int64)
+        end_pos = start_pos + 1
+        duration = delta[start_pos]
+
+        # Trading days on either side: skipped weekdays -> holiday, skipped weekend only -> weekend
+        if 'trading_date' in df.columns:
+            td = df['trading_date'].to_numpy().astype('datetime64[D]')
+        else:
+            td = times.dt.tz_localize(None).to_numpy().astype('datetime64[D]') if times.dt.tz is not None \
+                else t.astype('datetime64[D]')
+        td_start = td[start_pos]
+        td_end = td[end_pos]
+        skipped_weekdays = np.busday_count(td_start + 1, np.maximum(td_end, td_start + 1))
+        skips_days = (td_end - td_start).astype(np.int64) > 1
+
+        # Abbreviated sessions halt early: a long halt touching a holiday / early close is a holiday gap
+        flagged = np.zeros(len(start_pos), dtype=bool)
+        for col in ('is_holiday', 'is_early_close'):
+            if col in df.columns:
+                f = df[col].to_numpy(dtype=bool)
+                flagged |= f[start_pos] | f[end_pos]
+        flagged &= duration > cls.MAX_SESSION_BREAK.to_timedelta64()
+
+        end_minute = local_minutes(times.iloc[end_pos]) % MINUTES_PER_DAY if len(end_pos) else np.zeros(0, dtype=np.int64)
+        # Crossing the 18:00 rollover into the next trading day (a late first print still counts)
+        is_break = (td_end - td_start).astype(np.int64) == 1
+        is_break &= end_minute >= cls.SESSION_BREAK_END
+        is_break &= duration <= cls.MAX_SESSION_BREAK.to_timedelta64()
+
+        gap_type = np.select(
+            [skipped_weekdays > 0, skips_days, flagged, is_break],
+            [GAP_HOLIDAY, GAP_WEEKEND, GAP_HOLIDAY, GAP_SESSION_BREAK],
+            default=GAP_MISSING
+        )
+
+        table = pd.DataFrame({
+            'start_pos': start_pos,
+            'end_pos': end_pos,
+            'start': times.iloc[start_pos].reset_index(drop=True),
+            'end': times.iloc[end_pos].reset_index(drop=True),
+            'duration': pd.to_timedelta(duration),
+            'type': gap_type,
+        })
+        return cls(table)
+
+    @staticmethod
+    def _empty() -> pd.DataFrame:
+        return pd.DataFrame({
+            'start_pos': np.zeros(0, dtype=np.int64),
+            'end_pos': np.zeros(0, dtype=np.int64),
+            'start': pd.Series([], dtype='datetime64[ns]'),
+            'end': pd.Series([], dtype='datetime64[ns]'),
+            'duration': pd.Series([], dtype='timedelta64[ns]'),
+            'type': pd.Series([], dtype=object),
+        })
+
+    # --- Queries ---
+
+    def between(self, start, end) -> pd.DataFrame:
+        """Gaps that overlap [start, end)."""
+        tbl = self.table
+        return tbl[(tbl['end'] > start) & (tbl['start'] < end)]
+
+    def next_gap(self, pos: int) -> Optional[int]:
+        """Row position of the last bar before the first gap at/after bar `pos` (None if none)."""
+        k = np.searchsorted(self._start_pos, pos, side='left')
+        return int(self._start_pos[k]) if k < len(self._start_pos) else None
+
+    def crosses(self, start_pos: int, end_pos: int) -> bool:
+        """True if walking from bar start_pos to bar end_pos steps over a gap. O(log n)."""
+        k = np.searchsorted(self._start_pos, start_pos, side='left')
+        return bool(k < len(self._start_pos) and self._start_pos[k] < end_pos)
+
+    def summary(self) -> pd.Series:
+        return self.table['type'].value_counts()
@@ -0,0 +1,325 @@
+from collections import deque
+from typing import Optional, Tuple
+
+import numpy as np
+
+# Native NumPy indicator kernels.
+# Conventions follow Pine / PineTwin_KaizenV2_Logic so the research pipeline and the
+# live twin agree bar for bar:
+#   - TR on the first bar (no previous close) is high - low
+#   - ATR is Wilder's RMA seeded with the SMA of the first `length` TRs
+# Recursive indicators are resumable (state objects) so chunked / incremental loading
+# produces exactly the same numbers as a single pass.
+
+
+def true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray, prev_close: float = np.nan) -> np.ndarray:
+    """
+    max(high - low, |high - prev_close|, |low - prev_close|).
+    `prev_close` is the close before high[0] (NaN at the start of the series).
+    """
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+
+    prev = np.empty(len(close))
+    if len(close):
+        prev[0] = prev_close
+        prev[1:] = close[:-1]
+    # fmax ignores the NaN gap terms -> first bar falls back to high - low
+    return np.fmax(high - low, np.fmax(np.abs(high - prev), np.abs(low - prev)))
+
+
+class RMA:
+    """
+    Wilder's moving average (alpha = 1/length), seeded with the SMA of the first
+    `length` values. Same arithmetic as the twin: (prev * (length - 1) + x) / length.
+    Resumable: call update() with consecutive blocks.
+    """
+
+    def __init__(self, length: int):
+        self.length = length
+        self.seed = []
+        self.value = np.nan
+
+    def update(self, values: np.ndarray) -> np.ndarray:
+        length = self.length
+        seed = self.seed
+        prev = self.value
+        out = np.empty(len(values))
+        # Inherently sequential: plain floats in a tight loop beat per-element numpy calls
+        for i, x in enumerate(np.asarray(values, dtype=np.float64).tolist()):
+            if prev != prev:
+                seed.append(x)
+                if len(seed) == length:
+                    prev = sum(seed) / length # Python sum (sequential), as the twin does
+                    seed.clear()
+                out[i] = prev
+            else:
+                prev = (prev * (length - 1) + x) / length
+                out[i] = prev
+        self.value = prev
+        return out
+
+    def push(self, x: float) -> float:
+        """Single-value update (same arithmetic as update), for bar-by-bar consumers."""
+        if self.value != self.value:
+            self.seed.append(float(x))
+            if len(self.seed) == self.length:
+                self.value = sum(self.seed) / self.length
+                self.seed.clear()
+        else:
+            self.value = (self.value * (self.length - 1) + float(x)) / self.length
+        return self.value
+
+    def to_dict(self) -> dict:
+        return {'length': self.length, 'seed': list(self.seed), 'value': self.value}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "RMA":
+        rma = cls(d['length'])
+        rma.seed = list(d['seed'])
+        rma.value = d['value']
+        return rma
+
+
+class WindowExtreme:
+    """
+    Running max (or min) of the last `length` pushed values: monotonic deque, O(1) amortized
+    per push. Values are keyed by their absolute position so old ones expire by index.
+    """
+
+    def __init__(self, length: int, mode: str = 'max'):
+        self.length = length
+        self.is_max = mode == 'max'
+        self.window = deque() # (position, value), values monotonic from the front
+
+    def push(self, position: int, value: float) -> float:
+        window = self.window
+        if self.is_max:
+            while window and window[-1][1] <= value:
+                window.pop()
+        else:
+            while window and window[-1][1] >= value:
+                window.pop()
+        window.append((position, value))
+        while window[0][0] <= position - self.length:
+            window.popleft()
+        return window[0][1]
+
+    @property
+    def value(self) -> float:
+        return self.window[0][1] if self.window else np.nan
+
+
+def atr(high: np.ndarray, low: np.ndarray, close: np.ndarray, length: int = 14) -> np.ndarray:
+    """ATR(length): RMA of true range. NaN until `length` bars are available."""
+    return RMA(length).update(true_range(high, low, close))
+
+
+def _windows(values: np.ndarray, length: int) -> Optional[np.ndarray]:
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) < length:
+        return None
+    return np.lib.stride_tricks.sliding_window_view(values, length)
+
+
+def sma(values: np.ndarray, length: int) -> np.ndarray:
+    """Trailing simple moving average. NaN for the first length - 1 bars."""
+    out = np.full(len(values), np.nan)
+    win = _windows(values, length)
+    if win is not None:
+        # Mean of each window directly (no running sum -> no drift over long series)
+        out[length - 1:] = win.mean(axis=1)
+    return out
+
+
+def rolling_std(values: np.ndarray, length: int, ddof: int = 1) -> np.ndarray:
+    """Trailing rolling standard deviation (sample by default, like pandas)."""
+    out = np.full(len(values), np.nan)
+    win = _windows(values, length)
+    if win is not None:
+        out[length - 1:] = win.std(axis=1, ddof=ddof)
+    return out
+
+
+class SparseExtreme:
+    """
+    Doubling table of running extremes: levels[k][i] = extreme of values[i : i + 2**k].
+    Built once up to max_length, it answers any window length <= max_length as two
+    overlapping blocks, so several window sizes over the same series share the work
+    (O(n log max_length) to build, O(1) per query).
+
+    NaN propagates into every block that contains it, like a pandas rolling window;
+    skipna=True ignores NaN instead (a block is NaN only if all of its values are).
+    """
+
+    def __init__(self, values: np.ndarray, max_length: int, mode: str = 'max', skipna: bool = False):
+        self.values = np.asarray(values, dtype=np.float64)
+        if skipna:
+            self.ufunc = np.fmax if mode == 'max' else np.fmin
+        else:
+            self.ufunc = np.maximum if mode == 'max' else np.minimum
+        self.max_length = max_length
+        self.levels = [self.values]
+        span = 1
+        while span * 2 <= max_length and span < len(self.values):
+            block = self.levels[-1]
+            self.levels.append(self.ufunc(block[:-span], block[span:]))
+            span *= 2
+
+    def _level(self, length: int):
+        if length > self.max_length:
+            raise ValueError(f"Window {length} exceeds the table's max_length {self.max_length}.")
+        k = length.bit_length() - 1
+        return self.levels[k], 1 << k
+
+    def window(self, length: int, center: bool = False) -> np.ndarray:
+        """Rolling extreme over `length` bars (trailing or pandas-centered); NaN where incomplete."""
+        n = len(self.values)
+        out = np.full(n, np.nan)
+        if length < 1 or n < length:
+            return out
+        block, span = self._level(length)
+        count = n - length + 1
+        # Same alignment as pandas rolling(center=True): window ends (length - 1) // 2 bars ahead
+        lead = (length - 1) // 2 if center else 0
+        out[length - 1 - lead:n - lead] = self.ufunc(block[:count], block[length - span:length - span + count])
+        return out
+
+    def at(self, positions: np.ndarray, length: int, center: bool = False) -> np.ndarray:
+        """window(length, center)[positions], without computing the other rows."""
+        positions = np.asarray(positions, dtype=np.int64)
+        out = np.full(len(positions), np.nan)
+        if length < 1 or len(self.values) < length:
+            return out
+        block, span = self._level(length)
+        end = positions + ((length - 1) // 2 if center else 0)
+        first = end - length + 1
+        ok = (first >= 0) & (end < len(self.values))
+        out[ok] = self.ufunc(block[first[ok]], block[end[ok] - span + 1])
+        return out
+
+
+def segment_starts(keys: np.ndarray) -> np.ndarray:
+    """Start offsets of runs of equal consecutive keys (e.g. trading days)."""
+    keys = np.asarray(keys)
+    if len(keys) == 0:
+        return np.zeros(0, dtype=np.int64)
+    return np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+
+
+def segment_accumulate(values: np.ndarray, starts: np.ndarray, mode: str = 'max') -> np.ndarray:
+    """
+    Running max (or min) that restarts at every offset in `starts` (which begin at 0),
+    e.g. the session high so far. No groupby and no per-segment loop: a log-step scan
+    where each step only combines bars of the same segment. Exact (max / min only),
+    O(n log longest segment).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    ufunc = np.maximum if mode == 'max' else np.minimum
+    out = values.copy()
+    if n == 0:
+        return out
+    starts = np.asarray(starts, dtype=np.int64)
+    # Bars before each bar within its own segment
+    reach = np.arange(n) - np.repeat(starts, np.diff(np.r_[starts, n]))
+    span = 1
+    while span <= reach.max():
+        step = out.copy()
+        ufunc(out[span:], out[:-span], out=step[span:], where=reach[span:] >= span)
+        out = step
+        span *= 2
+    return out
+
+
+def segment_mean(values: np.ndarray, first: np.ndarray, count: np.ndarray) -> np.ndarray:
+    """
+    Mean of values[first[k] : first[k] + count[k]] for every segment k.
+    Segments of equal length are gathered into one 2D block and reduced row-wise, which
+    sums in the same (pairwise) order as values[a:b].mean() - np.add.reduceat sums
+    strictly left to right and drifts from it by an ulp.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    first = np.asarray(first, dtype=np.int64)
+    count = np.asarray(count, dtype=np.int64)
+    out = np.full(len(first), np.nan)
+    for length in np.unique(count[count > 0]).tolist():
+        k = np.flatnonzero(count == length)
+        out[k] = values[first[k, None] + np.arange(length)].mean(axis=1)
+    return out
+
+
+def anchored_cumsum(values: np.ndarray, starts: np.ndarray, seed: float = 0.0) -> np.ndarray:
+    """
+    Cumulative sum that restarts at every offset in `starts`.
+    The first segment continues from `seed` (running total carried from a previous block).
+    Sums are strictly sequential, so splitting a segment across blocks is bit-identical.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    out = np.empty(n)
+    ends = np.r_[starts[1:], n].astype(np.int64)
+    for k, (a, b) in enumerate(zip(starts, ends)):
+        if k == 0 and seed != 0.0:
+            out[a:b] = np.cumsum(np.r_[seed, values[a:b]])[1:]
+        else:
+            out[a:b] = np.cumsum(values[a:b])
+    return out
+
+
+def session_vwap(high: np.ndarray, low: np.ndarray, close: np.ndarray, volume: np.ndarray,
+                 starts: np.ndarray, seed_pv: float = 0.0, seed_vol: float = 0.0) -> Tuple[np.ndarray, float, float]:
+    """
+    Typical-price VWAP anchored at every offset in `starts` (e.g. the 18:00 ET reset).
+    The first session continues from the running sums seed_pv / seed_vol (a day still open
+    at the end of the previous block). Returns (vwap, cum_pv, cum_vol) with the running
+    sums at the last bar, to seed the next block.
+    """
+    tp = (np.asarray(high, dtype=np.float64) + low + close) / 3
+    cum_pv = anchored_cumsum(tp * volume, starts, seed=seed_pv)
+    cum_vol = anchored_cumsum(volume, starts, seed=seed_vol)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        vwap = cum_pv / cum_vol
+    if len(vwap) == 0:
+        return vwap, seed_pv, seed_vol
+    return vwap, cum_pv[-1], cum_vol[-1]
+
+
+if __name__ == "__main__":
+    import os
+    import sys
+    import subprocess
+    from live.pine_twin import PineTwin_KaizenV2_Logic
+
+    # 1. Parity: ATR vs the twin's streaming RMA
+    rng = np.random.default_rng(7)
+    n = 20000
+    close = 5000 + np.cumsum(rng.integers(-4, 5, n) * 0.25)
+    open_ = np.r_[close[0], close[:-1]]
+    high = np.maximum(open_, close) + rng.integers(0, 4, n) * 0.25
+    low = np.minimum(open_, close) - rng.integers(0, 4, n) * 0.25
+    volume = rng.integers(1, 500, n).astype(np.float64)
+
+    twin = PineTwin_KaizenV2_Logic()
+    twin_atr = np.empty(n)
+    for i in range(n):
+        twin.on_bar_close(1_700_000_000_000 + i * 60_000, open_[i], high[i], low[i], close[i], volume[i])
+        twin_atr[i] = twin.prev_atr
+
+    ours = atr(high, low, close, 14)
+    assert np.array_equal(ours, twin_atr, equal_nan=True), "ATR diverges from PineTwin"
+    print(f"ATR parity with PineTwin: {n} bars bit-identical")
+
+    # 2. Import-time benchmark (fresh interpreter each)
+    def import_seconds(stmt: str) -> float:
+        code = f"import time; t=time.perf_counter(); {stmt}; print(time.perf_counter()-t)"
+        res = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+        return float(res.stdout.strip()) if res.returncode == 0 else float('nan')
+
+    base = import_seconds("import pandas, numpy")
+    native = import_seconds("import pandas, numpy, indicators")
+    legacy = import_seconds("import pandas, numpy, pandas_ta")
+    print(f"Import time over pandas+numpy: indicators +{native - base:.3f}s | pandas_ta "
+          + (f"+{legacy - base:.3f}s" if legacy == legacy else "(not installed)"))
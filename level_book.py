@@ -0,0 +1,153 @@
+from bisect import bisect_left, bisect_right
+from time import perf_counter
+from typing import Dict, Hashable, List, Optional, Tuple
+
+
+class LevelBook:
+    """
+    Active swing levels keyed by price, for bar-by-bar consumers (StateBuilder, live twin).
+
+    Swing highs and swing lows live in two price-sorted arrays (bisect), plus an
+    insertion-ordered dict for their age:
+      - add           : O(log n) search (+ a short memmove), evicts the oldest level past capacity
+      - invalidate    : a close above a swing high / below a swing low removes it; the
+                        broken levels are always a prefix (highs) / suffix (lows) of the
+                        sorted array, so a close costs O(log n) plus the levels it removes
+      - nearest_*     : lowest swing high above / highest swing low below a price, O(log n)
+
+    Keys are any hashable id of the level (event row, LevelIndex position, bar index).
+    Prices must be in one unit throughout (StateBuilder uses points).
+
+    Usage:
+        book = LevelBook(capacity=50)
+        book.add(key, 5012.25, is_high=True)
+        broken = book.invalidate(close)
+        resistance, support = book.nearest_resistance(close), book.nearest_support(close)
+    """
+
+    def __init__(self, capacity: Optional[int] = None):
+        self.capacity = capacity
+        self._prices = {True: [], False: []} # is_high -> sorted prices
+        self._keys = {True: [], False: []}   # is_high -> keys, parallel to the prices
+        self._levels: Dict[Hashable, Tuple[float, bool]] = {} # key -> (price, is_high), oldest first
+
+    def __len__(self) -> int:
+        return len(self._levels)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._levels
+
+    def keys(self) -> List[Hashable]:
+        """Keys of the live levels, oldest first."""
+        return list(self._levels)
+
+    def newest(self, count: int) -> List[Hashable]:
+        """Keys of the `count` most recently added live levels, oldest first."""
+        if count >= len(self._levels):
+            return list(self._levels)
+        keys = []
+        for key in reversed(self._levels):
+            keys.append(key)
+            if len(keys) == count:
+                break
+        return keys[::-1]
+
+    def add(self, key: Hashable, price: float, is_high: bool) -> List[Hashable]:
+        """Adds a level; returns the keys evicted to stay within capacity (oldest first)."""
+        if key in self._levels:
+            self.remove(key)
+        prices, keys = self._prices[is_high], self._keys[is_high]
+        at = bisect_right(prices, price) # Equal prices keep their insertion order
+        prices.insert(at, price)
+        keys.insert(at, key)
+        self._levels[key] = (price, is_high)
+
+        evicted = []
+        while self.capacity is not None and len(self._levels) > self.capacity:
+            oldest = next(iter(self._levels))
+            self.remove(oldest)
+            evicted.append(oldest)
+        return evicted
+
+    def remove(self, key: Hashable):
+        price, is_high = self._levels.pop(key)
+        prices, keys = self._prices[is_high], self._keys[is_high]
+        at = bisect_left(prices, price)
+        while keys[at] != key: # Among equal prices
+            at += 1
+        del prices[at]
+        del keys[at]
+
+    def invalidate(self, close: float) -> List[Hashable]:
+        """Removes the swing highs closed above and the swing lows closed below; returns their keys."""
+        highs = bisect_left(self._prices[True], close)  # price < close
+        lows = bisect_right(self._prices[False], close) # price > close from here on
+        broken = self._keys[True][:highs] + self._keys[False][lows:]
+        if broken:
+            del self._prices[True][:highs], self._keys[True][:highs]
+            del self._prices[False][lows:], self._keys[False][lows:]
+            for key in broken:
+                del self._levels[key]
+        return broken
+
+    def nearest_resistance(self, price: float) -> Optional[float]:
+        """Lowest swing high strictly above price (None if none)."""
+        prices = self._prices[True]
+        at = bisect_right(prices, price)
+        return prices[at] if at < len(prices) else None
+
+    def nearest_support(self, price: float) -> Optional[float]:
+        """Highest swing low strictly below price (None if none)."""
+        prices = self._prices[False]
+        at = bisect_left(prices, price)
+        return prices[at - 1] if at > 0 else None
+
+
+if __name__ == "__main__":
+    # Microbenchmark: StateBuilder's swing bookkeeping on the full history, LevelBook
+    # vs the list scan it replaces (invalidate, add, nearest support / resistance per bar)
+    import numpy as np
+    from data_loader import DataLoader, price_scale
+    from structure import StructureExtractor
+
+    loader = DataLoader(r"C:\Users\CEO\.gemini\antigravity\scratch\kaizen_1m_data_ibkr_2yr.csv")
+    df = loader.load_and_process()
+    swings = StructureExtractor(df).swing_arrays()
+    close = (df['close'].to_numpy() * price_scale(df)).tolist()
+    order = np.argsort(swings['confirm_pos'], kind='stable')
+    confirm = swings['confirm_pos'][order].tolist()
+    price = swings['price_level'][order].tolist()
+    is_high = swings['is_high'][order].tolist()
+    ends = np.searchsorted(swings['confirm_pos'][order], np.arange(len(close)), side='right').tolist()
+
+    def run_book():
+        book, out, k = LevelBook(capacity=50), [], 0
+        for t, c in enumerate(close):
+            book.invalidate(c)
+            while k < ends[t]:
+                book.add(k, price[k], is_high[k])
+                k += 1
+            out.append((book.nearest_support(c), book.nearest_resistance(c)))
+        return out
+
+    def run_scan():
+        active, out, k = [], [], 0
+        for t, c in enumerate(close):
+            active = [s for s in active if (c <= price[s] if is_high[s] else c >= price[s])]
+            while k < ends[t]:
+                active.append(k)
+                k += 1
+            active = active[-50:]
+            resistances = [price[s] for s in active if is_high[s] and price[s] > c]
+            supports = [price[s] for s in active if not is_high[s] and price[s] < c]
+            out.append((max(supports) if supports else None, min(resistances) if resistances else None))
+        return out
+
+    t0 = perf_counter()
+    scanned = run_scan()
+    t1 = perf_counter()
+    booked = run_book()
+    t2 = perf_counter()
+    assert booked == scanned
+    print(f"{len(close)} bars, {len(price)} swings | list scan {t1 - t0:.2f}s | LevelBook {t2 - t1:.2f}s "
+          f"({(t2 - t1) / len(close) * 1e6:.2f} us/bar) | identical")
@@ -0,0 +1,188 @@
+from time import perf_counter
+from typing import List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from data_loader import price_scale
+from events import EventTable, EVENT_CODES
+from range_index import RangeIndex
+from schema import EventType
+
+
+class LevelIndex:
+    """
+    Lifecycle of every swing level, computed once for the whole history.
+
+    A level is live from its swing's confirmation bar c. From bar c + 1 on:
+      - touch       : the bar reaches the level (high >= level for a swing high, low <= level for a low)
+      - invalidated : first bar closing through the level (the StateBuilder rule)
+      - test        : a run of consecutive touching bars before the invalidation bar;
+                      tested_count is the number of such runs so far
+      - swept       : a test whose wick traded through the level (close still held it)
+
+    Per level (rows follow the swing rows of the source table):
+        table_row, level (points), is_high, confirmed_idx,
+        invalidated_idx (-1 = never), first_touch_idx (-1 = never), touch_count, sweep_count
+    Per test (CSR, grouped by level, in bar order; touch_offsets[i]:touch_offsets[i + 1] are level i's):
+        touch_start, touch_end (bar rows), touch_swept, touch_depth (points beyond the level)
+
+    First hits are binary-lifting searches on range max / min tables (RangeIndex.first_hit),
+    so a level costs O(log n) per test instead of a scan of every later bar.
+    tested_count(rows, t) and is_active(rows, t) answer "as of bar t" for many levels
+    at once in O(log n) each.
+    """
+
+    def __init__(self, df: pd.DataFrame, table: EventTable, confirmed_idx: Optional[np.ndarray] = None):
+        """
+        confirmed_idx: confirmation bar of every table row as a row of df, for a table built
+        on another frame (e.g. full-history events over a load_range slice); -1 = not in df,
+        and those swings are left out. Default: the table's own confirmed_idx (built on df).
+        """
+        self.df = df
+        self.n = len(df)
+        confirmed = table['confirmed_idx'] if confirmed_idx is None else np.asarray(confirmed_idx, dtype=np.int64)
+        swings = np.flatnonzero(table.of_type(EventType.SWING_HIGH, EventType.SWING_LOW) & (confirmed >= 0))
+        self.table_row = swings
+        self.level = table['price_level'][swings]
+        self.is_high = table['event_type'][swings] == EVENT_CODES[EventType.SWING_HIGH]
+        self.confirmed_idx = confirmed[swings]
+        self._build()
+
+    def __len__(self) -> int:
+        return len(self.table_row)
+
+    def _build(self):
+        scale = price_scale(self.df)
+        n, count = self.n, len(self)
+        inv = np.full(count, n, dtype=np.int64)
+        starts: List[np.ndarray] = []
+        ends: List[np.ndarray] = []
+        owners: List[np.ndarray] = []
+        depths: List[np.ndarray] = []
+
+        # Same comparisons as StateBuilder: frame price * scale against the level in points
+        ranges = RangeIndex.from_frame(self.df, scale=scale)
+        sides = (
+            # (levels, wick that touches, its table mode, touch test, break test)
+            (np.flatnonzero(self.is_high), 'high', 'max', np.greater_equal, np.greater),
+            (np.flatnonzero(~self.is_high), 'low', 'min', np.less_equal, np.less),
+        )
+        for rows, wick, mode, touches, breaks in sides:
+            if len(rows) == 0 or n == 0:
+                continue
+            away = 'min' if mode == 'max' else 'max' # First bar off the level again
+
+            def leaves(values, levels, touches=touches):
+                return ~touches(values, levels) # A NaN bar does not touch, so it ends a test
+
+            level = self.level[rows]
+            pos = self.confirmed_idx[rows] + 1
+            inv[rows] = ranges.first_hit('close', mode, pos, None, level, breaks)
+
+            live = np.arange(len(rows))
+            # One round per test: next touching bar, then the last bar of that run
+            while len(live):
+                start = ranges.first_hit(wick, mode, pos, inv[rows[live]], level[live], touches)
+                held = start < inv[rows[live]]
+                live, start = live[held], start[held]
+                if len(live) == 0:
+                    break
+                end = ranges.first_hit(wick, away, start, inv[rows[live]], level[live], leaves, skipna=False) - 1
+                depths.append(np.abs(ranges.extreme(wick, mode, start, end) - level[live]))
+                starts.append(start)
+                ends.append(end)
+                owners.append(rows[live])
+                pos = end + 1
+            ranges.clear() # Full-length tables: keep at most one side's in memory
+
+        owner = np.concatenate(owners) if owners else np.zeros(0, dtype=np.int64)
+        order = np.lexsort((np.concatenate(starts) if starts else owner, owner))
+        self.touch_level = owner[order]
+        self.touch_start = (np.concatenate(starts) if starts else owner)[order]
+        self.touch_end = (np.concatenate(ends) if ends else owner)[order]
+        self.touch_depth = (np.concatenate(depths) if depths else np.zeros(0))[order]
+        self.touch_swept = self.touch_depth > 0
+        self.touch_offsets = np.r_[0, np.cumsum(np.bincount(self.touch_level, minlength=count))].astype(np.int64)
+        # Sorted (level, bar) keys: a level's tests as of bar t are one searchsorted away
+        self._touch_keys = self.touch_level * (n + 1) + self.touch_start
+
+        self._invalidated = inv
+        self.invalidated_idx = np.where(inv < n, inv, -1)
+        self.touch_count = np.diff(self.touch_offsets)
+        has_touch = self.touch_count > 0
+        self.first_touch_idx = np.full(count, -1, dtype=np.int64)
+        self.first_touch_idx[has_touch] = self.touch_start[self.touch_offsets[:-1][has_touch]]
+        self.sweep_count = np.bincount(self.touch_level[self.touch_swept], minlength=count).astype(np.int64)
+
+    # --- As-of queries (rows are level positions, t bar rows; both broadcast) ---
+
+    def tested_count(self, rows: Union[int, np.ndarray], t: Union[int, np.ndarray]) -> np.ndarray:
+        """Tests of each level that started at or before bar t."""
+        rows = np.asarray(rows, dtype=np.int64)
+        keys = rows * (self.n + 1) + np.asarray(t, dtype=np.int64)
+        return np.searchsorted(self._touch_keys, keys, side='right') - self.touch_offsets[rows]
+
+    def is_active(self, rows: Union[int, np.ndarray], t: Union[int, np.ndarray]) -> np.ndarray:
+        """Confirmed at or before bar t and not yet invalidated (a level survives its own bar c)."""
+        rows = np.asarray(rows, dtype=np.int64)
+        return (self.confirmed_idx[rows] <= t) & (self._invalidated[rows] > t)
+
+    def active_at(self, t: int) -> np.ndarray:
+        """Level positions live at bar t, in source table order."""
+        return np.flatnonzero((self.confirmed_idx <= t) & (self._invalidated > t))
+
+    def to_frame(self) -> pd.DataFrame:
+        """One row per level, bar columns as timestamps (NaT = never)."""
+        times = pd.DatetimeIndex(self.df['time'])
+
+        def stamps(idx: np.ndarray) -> pd.DatetimeIndex:
+            return pd.DatetimeIndex(np.where(idx >= 0, times[np.maximum(idx, 0)], pd.NaT)) if len(times) else times[:0]
+
+        return pd.DataFrame({
+            'table_row': self.table_row,
+            'level': self.level,
+            'is_high': self.is_high,
+            'confirmed_at': stamps(self.confirmed_idx),
+            'first_touch': stamps(self.first_touch_idx),
+            'invalidated_at': stamps(self.invalidated_idx),
+            'touch_count': self.touch_count,
+            'sweep_count': self.sweep_count,
+        })
+
+
+if __name__ == "__main__":
+    # Test run: lifecycle of the full history's swings vs a bar-by-bar replay
+    from data_loader import DataLoader
+    from structure import StructureExtractor
+
+    loader = DataLoader(r"C:\Users\CEO\.gemini\antigravity\scratch\kaizen_1m_data_ibkr_2yr.csv")
+    df = loader.load_and_process()
+    swings = StructureExtractor(df).swing_table()
+
+    t0 = perf_counter()
+    levels = LevelIndex(df, swings)
+    print(f"LevelIndex: {len(levels)} levels, {len(levels.touch_start)} tests "
+          f"({levels.touch_swept.sum()} swept) in {perf_counter() - t0:.2f}s")
+    print(levels.to_frame().head())
+
+    # Replay a sample of levels bar by bar with the StateBuilder rules
+    scale = price_scale(df)
+    high, low, close = (df[c].to_numpy() * scale for c in ('high', 'low', 'close'))
+    rng = np.random.default_rng(0)
+    for i in rng.choice(len(levels), size=min(300, len(levels)), replace=False).tolist():
+        p, up = levels.level[i], levels.is_high[i]
+        inv, tests, touching = -1, [], False
+        for t in range(levels.confirmed_idx[i] + 1, len(df)):
+            if (close[t] > p) if up else (close[t] < p):
+                inv = t
+                break
+            touch = high[t] >= p if up else low[t] <= p
+            if touch and not touching:
+                tests.append(t)
+            touching = touch
+        assert levels.invalidated_idx[i] == inv, i
+        assert levels.touch_start[levels.touch_offsets[i]:levels.touch_offsets[i + 1]].tolist() == tests, i
+        for t in tests:
+            assert levels.tested_count(i, t) == tests.index(t) + 1 and levels.tested_count(i, t - 1) == tests.index(t)
+    print("Sampled levels match the bar-by-bar replay")
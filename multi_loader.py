@@ -0,0 +1,130 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+from typing import Dict, Iterable, Mapping, Optional, Union
+
+import pandas as pd
+
+from data_loader import DataLoader, TICK_SIZE
+
+
+def _process_instrument(symbol: str, filepath: str, cache_dir: Optional[str], tick_size: float):
+    """
+    Worker: ingest + features for one contract, run in a child process.
+    With a cache the frame stays on disk (the parent maps it back), so nothing
+    large is pickled across the process boundary. Without one the frame and its
+    gap index are sent back, since the parent has nowhere to reload them from.
+    """
+    loader = DataLoader(filepath, cache_dir=cache_dir, use_cache=cache_dir is not None, tick_size=tick_size)
+    df = loader.load_and_process()
+    if cache_dir is not None:
+        return symbol, loader.last_load_seconds, None, None
+    return symbol, loader.last_load_seconds, df, loader.gap_index
+
+
+class MultiInstrumentLoader:
+    """
+    Loads several contracts at once (one CSV per instrument) across a process pool.
+
+    Each instrument is an independent DataLoader pipeline, so ingest and feature
+    computation parallelise without coordination; workers write the columnar cache
+    and the parent then opens every entry memory-mapped.
+
+    Usage:
+        multi = MultiInstrumentLoader({'ES': 'es_1m.csv', 'NQ': 'nq_1m.csv'})
+        data = multi.load_all()       # {'ES': df, 'NQ': df}
+        multi.loaders['NQ'].gap_index # per-instrument loader (load_range, build_pyramid, ...)
+    """
+
+    def __init__(self, instruments: Union[Mapping[str, str], Iterable[str]], cache_dir: Optional[str] = "cache",
+                 compact: bool = False, tick_sizes: Optional[Dict[str, float]] = None,
+                 max_workers: Optional[int] = None):
+        if not isinstance(instruments, Mapping):
+            # Plain list of paths: the file name is the symbol (ES_1m.csv -> ES_1m)
+            instruments = {os.path.splitext(os.path.basename(p))[0]: p for p in instruments}
+        self.instruments: Dict[str, str] = dict(instruments)
+        self.cache_dir = cache_dir
+        self.compact = compact
+        self.tick_sizes = tick_sizes or {}
+        self.max_workers = max_workers
+
+        self.loaders: Dict[str, DataLoader] = {}
+        self.data: Dict[str, pd.DataFrame] = {}
+        self.worker_seconds: Dict[str, float] = {} # Per-instrument processing time inside the pool
+        self.last_load_seconds = None
+
+    def load_all(self) -> Dict[str, pd.DataFrame]:
+        t0 = perf_counter()
+        symbols = list(self.instruments)
+        workers = self.max_workers or min(len(symbols), os.cpu_count() or 1)
+        print(f"Loading {len(symbols)} instruments on {workers} worker(s)...")
+
+        frames, gap_indexes = {}, {}
+        if workers <= 1 or len(symbols) <= 1:
+            results = [_process_instrument(s, self.instruments[s], self.cache_dir, self._tick_size(s)) for s in symbols]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(_process_instrument, s, self.instruments[s], self.cache_dir, self._tick_size(s))
+                           for s in symbols]
+                results = [f.result() for f in futures]
+
+        for symbol, seconds, frame, gaps in results:
+            self.worker_seconds[symbol] = seconds
+            frames[symbol] = frame
+            gap_indexes[symbol] = gaps
+
+        # Re-open every instrument in this process (cache hit -> memory-mapped, near free)
+        for symbol in symbols:
+            loader = DataLoader(self.instruments[symbol], cache_dir=self.cache_dir,
+                                use_cache=self.cache_dir is not None, compact=self.compact,
+                                tick_size=self._tick_size(symbol))
+            if frames[symbol] is not None:
+                # Same state as an uncached load_and_process() in this process
+                loader.processed_data = loader._finalize(frames[symbol])
+                loader.gap_index = gap_indexes[symbol]
+                loader.cache_hit = False
+                loader.appended_bars = len(frames[symbol])
+                loader.last_load_seconds = self.worker_seconds[symbol]
+            else:
+                loader.load_and_process()
+            self.loaders[symbol] = loader
+            self.data[symbol] = loader.processed_data
+
+        self.last_load_seconds = perf_counter() - t0
+        print(f"Loaded {len(symbols)} instruments in {self.last_load_seconds:.2f}s "
+              f"(sum of per-instrument work: {sum(self.worker_seconds.values()):.2f}s)")
+        return self.data
+
+    def _tick_size(self, symbol: str) -> float:
+        return self.tick_sizes.get(symbol, TICK_SIZE)
+
+    def __getitem__(self, symbol: str) -> pd.DataFrame:
+        return self.data[symbol]
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+
+if __name__ == "__main__":
+    # Test run: every CSV in the scratch folder is one instrument
+    data_dir = r"C:\Users\CEO\.gemini\antigravity\scratch\instruments"
+    paths = [os.path.join(data_dir, f) for f in sorted(os.listdir(data_dir)) if f.endswith('.csv')]
+
+    # Cold runs (no cache) so both modes do the full ingest + feature work
+    serial = MultiInstrumentLoader(paths, cache_dir=None, max_workers=1)
+    serial.load_all()
+    parallel = MultiInstrumentLoader(paths, cache_dir=None)
+    parallel.load_all()
+    for symbol in serial:
+        pd.testing.assert_frame_equal(serial[symbol], parallel[symbol], check_exact=True)
+    print(f"Serial: {serial.last_load_seconds:.2f}s | Parallel: {parallel.last_load_seconds:.2f}s "
+          f"| Speedup: {serial.last_load_seconds / max(parallel.last_load_seconds, 1e-9):.1f}x "
+          f"on {os.cpu_count()} cores")
+
+    # Cached: workers populate the store, the parent maps every entry
+    cached = MultiInstrumentLoader(paths)
+    for symbol, df in cached.load_all().items():
+        print(f"{symbol}: {len(df)} bars, {df['time'].iloc[0]} -> {df['time'].iloc[-1]}")
@@ -0,0 +1,379 @@
+from collections import deque
+from typing import Any, Dict, List, Mapping, Optional
+
+import numpy as np
+
+from schema import (
+    StructureEvent, SwingEvent, CompressionEvent, DisplacementEvent, LiquiditySweepEvent,
+    ContextTags, EventType, Direction, Regime, Session, context_tags, event_key, id_kind
+)
+from indicators import RMA, WindowExtreme
+
+
+class _Swing:
+    """A detected pivot waiting for confirmation / its major flag."""
+    __slots__ = ('pos', 'is_high', 'level', 'confirm_pos', 'is_major', 'event', 'waiting_sweeps')
+
+    def __init__(self, pos: int, is_high: bool, level: float, confirm_pos: int):
+        self.pos = pos
+        self.is_high = is_high
+        self.level = level
+        self.confirm_pos = confirm_pos
+        self.is_major: Optional[bool] = None # None until the major window has closed
+        self.event: Optional[SwingEvent] = None
+        self.waiting_sweeps: List[int] = [] # Bars whose sweep of this swing awaits is_major
+
+
+class OnlineStructureExtractor:
+    """
+    Push-bar twin of StructureExtractor, for live feeds and bar-by-bar checks against
+    PineTwin_KaizenV2_Logic.
+
+    push_bar(bar) takes one processed 1m bar (time, open, high, low, close, volume,
+    session, vwap - prices in points) and returns the events that became known on it.
+    ATR(14) and the 20-bar volume statistics are maintained internally; pivot windows
+    use monotonic deques (O(1) amortized per bar).
+
+    Events are identical to the batch extractor's (same ids, fields and confirmed_at).
+    Displacements and sweeps are emitted on their confirmed_at bar. Two batch
+    definitions reach past confirmed_at, so those events are emitted once they are
+    causally known instead:
+      - is_major compares against the major window, which closes
+        (major_window - 1) // 2 - right_bars bars after confirmation. Swings, and sweeps
+        of a swing, wait for it.
+      - a compression block is confirmed at its last compressed bar, which is only
+        known on the following bar.
+    flush() emits what is still pending once the data ends (as the batch does).
+    """
+
+    ATR_LENGTH = 14
+    VOLUME_WINDOW = 20
+
+    def __init__(self, left_bars: int = 5, right_bars: int = 5, major_factor: int = 3,
+                 min_bars: int = 12, max_atr_ratio: float = 0.8,
+                 min_atr_magnitude: float = 2.0, min_volume_z: float = 1.5,
+                 min_reclaim_pts: float = 0.0):
+        if left_bars > right_bars:
+            # The centered pivot window would end after the confirmation bar
+            raise ValueError("Online extraction needs left_bars <= right_bars.")
+        self.right_bars = right_bars
+        self.min_bars = min_bars
+        self.max_atr_ratio = max_atr_ratio
+        self.min_atr_magnitude = min_atr_magnitude
+        self.min_volume_z = min_volume_z
+        self.min_reclaim_pts = min_reclaim_pts
+
+        # Centered windows exactly as pandas rolling(center=True) lays them out
+        window_size = left_bars + right_bars + 1
+        major_window = (left_bars * major_factor) + (right_bars * major_factor) + 1
+        self.window_size = window_size
+        self.major_window = major_window
+        self.minor_lead = (window_size - 1) // 2 # Bars after the pivot in its window
+        self.major_lead = (major_window - 1) // 2
+
+        self.minor_high = WindowExtreme(window_size, 'max')
+        self.minor_low = WindowExtreme(window_size, 'min')
+        self.major_high = WindowExtreme(major_window, 'max')
+        self.major_low = WindowExtreme(major_window, 'min')
+
+        # Recent bars (enough to reach back across the major window)
+        self.bars = deque(maxlen=max(major_window, window_size, min_bars) + right_bars + 1)
+        self.n = 0
+
+        # ATR / volume / compression state
+        self.atr = RMA(self.ATR_LENGTH)
+        self.prev_close = np.nan
+        self.volumes = deque(maxlen=self.VOLUME_WINDOW)
+        self.ranges = deque(maxlen=min_bars)
+        self.block = None # Open compression block: {'start_time', 'tr', 'atr'}
+
+        # Swing lifecycle
+        self.unconfirmed: deque = deque() # Detected, confirm_pos not reached yet
+        self.unresolved: deque = deque()  # is_major not known yet
+        self.last_high: Optional[_Swing] = None # Most recent confirmed swing high / low
+        self.last_low: Optional[_Swing] = None
+
+    # --- Public API ---
+
+    def push_bar(self, bar: Mapping[str, Any]) -> List[StructureEvent]:
+        """Feeds the next bar (time-ordered). Returns the events that became known on it."""
+        j = self.n
+        self.n += 1
+        high, low, close, volume = float(bar['high']), float(bar['low']), float(bar['close']), float(bar['volume'])
+
+        # ATR (14): same RMA kernel as the loader; 0 until seeded (loader fills NaN with 0)
+        prev = self.prev_close
+        tr = high - low if prev != prev else max(high - low, max(abs(high - prev), abs(low - prev)))
+        self.prev_close = close
+        atr = self.atr.push(tr)
+        atr = 0.0 if atr != atr else atr
+
+        self.bars.append({'time': bar['time'], 'open': float(bar['open']), 'high': high, 'low': low,
+                          'close': close, 'session': bar['session'], 'vwap': float(bar['vwap']), 'atr': atr})
+        events: List[StructureEvent] = []
+
+        self._update_swings(j, high, low, events)
+        self._check_sweeps(j, high, low, close, events)
+        self._check_displacement(j, high, low, volume, atr, events)
+        self._update_compression(j, high, low, atr, events)
+        return events
+
+    def flush(self) -> List[StructureEvent]:
+        """End of data: resolves what the batch extractor resolves at the last bar."""
+        events: List[StructureEvent] = []
+        # Pivots whose major window runs past the data are minor only (pandas: NaN window)
+        while self.unresolved:
+            self._resolve(self.unresolved.popleft(), False, events)
+        # Open compression block ends at the last bar
+        if self.block is not None:
+            events.append(self._compression_event(self.n - 1))
+            self.block = None
+        return events
+
+    # --- Swings ---
+
+    def _bar(self, pos: int) -> Dict[str, Any]:
+        return self.bars[pos - (self.n - len(self.bars))]
+
+    def _update_swings(self, j: int, high: float, low: float, events: List[StructureEvent]) -> None:
+        max_minor = self.minor_high.push(j, high)
+        min_minor = self.minor_low.push(j, low)
+        max_major = self.major_high.push(j, high)
+        min_major = self.major_low.push(j, low)
+
+        # 1. Pivot detection: the window centered on j - minor_lead is complete
+        if j + 1 >= self.window_size:
+            pos = j - self.minor_lead
+            cand = self._bar(pos)
+            if cand['high'] == max_minor:
+                self._detect(_Swing(pos, True, cand['high'], pos + self.right_bars))
+            if cand['low'] == min_minor:
+                self._detect(_Swing(pos, False, cand['low'], pos + self.right_bars))
+
+        # 2. Major flag: the major window centered on j - major_lead just closed
+        while self.unresolved and self.unresolved[0].pos <= j - self.major_lead:
+            swing = self.unresolved.popleft()
+            full = j + 1 >= self.major_window and swing.pos == j - self.major_lead
+            extreme = max_major if swing.is_high else min_major
+            self._resolve(swing, full and swing.level == extreme, events)
+
+        # 3. Confirmation: the swing becomes the active level for sweeps from this bar on
+        while self.unconfirmed and self.unconfirmed[0].confirm_pos <= j:
+            swing = self.unconfirmed.popleft()
+            if swing.is_high:
+                self.last_high = swing
+            else:
+                self.last_low = swing
+            self._emit_swing(swing, events)
+
+    def _detect(self, swing: _Swing) -> None:
+        self.unconfirmed.append(swing)
+        self.unresolved.append(swing)
+
+    def _resolve(self, swing: _Swing, is_major: bool, events: List[StructureEvent]) -> None:
+        swing.is_major = is_major
+        self._emit_swing(swing, events)
+
+    def _emit_swing(self, swing: _Swing, events: List[StructureEvent]) -> None:
+        """Emits once both confirmed and resolved; releases sweeps that waited on it."""
+        if swing.event is not None or swing.is_major is None or swing.confirm_pos >= self.n:
+            return
+        bar = self._bar(swing.pos)
+        event_type = EventType.SWING_HIGH if swing.is_high else EventType.SWING_LOW
+        direction = Direction.BEARISH if swing.is_high else Direction.BULLISH
+        swing.event = SwingEvent(
+            key=event_key(id_kind(event_type, direction), bar['time']),
+            event_type=event_type,
+            start_bar=bar['time'],
+            end_bar=bar['time'],
+            confirmed_at=self._bar(swing.confirm_pos)['time'],
+            direction=direction,
+            confidence_score=1.0,
+            context=self._context(bar, Regime.CHOP, 0),
+            price_level=swing.level,
+            is_major=swing.is_major
+        )
+        events.append(swing.event)
+        for pos in swing.waiting_sweeps:
+            events.append(self._sweep_event(pos, swing))
+        swing.waiting_sweeps = []
+
+    # --- Sweeps ---
+
+    def _check_sweeps(self, j: int, high: float, low: float, close: float, events: List[StructureEvent]) -> None:
+        # Bearish Sweep (Sweep High): High breached, but Close rejected
+        swing = self.last_high
+        if swing is not None and high > swing.level and close < swing.level - self.min_reclaim_pts:
+            self._sweep(j, swing, events)
+        # Bullish Sweep (Sweep Low)
+        swing = self.last_low
+        if swing is not None and low < swing.level and close > swing.level + self.min_reclaim_pts:
+            self._sweep(j, swing, events)
+
+    def _sweep(self, j: int, swing: _Swing, events: List[StructureEvent]) -> None:
+        if swing.event is None:
+            swing.waiting_sweeps.append(j) # is_major still unknown
+        else:
+            events.append(self._sweep_event(j, swing))
+
+    def _sweep_event(self, pos: int, swing: _Swing) -> LiquiditySweepEvent:
+        bar = self._bar(pos)
+        bearish = swing.is_high
+        direction = Direction.BEARISH if bearish else Direction.BULLISH
+        return LiquiditySweepEvent(
+            key=event_key(id_kind(EventType.LIQUIDITY_SWEEP, direction), bar['time']),
+            event_type=EventType.LIQUIDITY_SWEEP,
+            start_bar=bar['time'],
+            end_bar=bar['time'],
+            confirmed_at=bar['time'],
+            direction=direction,
+            confidence_score=1.0,
+            context=self._context(bar, Regime.CHOP, 0.0),
+            swept_level=swing.level,
+            sweep_depth=float(bar['high'] - swing.level) if bearish else float(swing.level - bar['low']),
+            swing_key=swing.event.key,
+            is_major=swing.event.is_major
+        )
+
+    # --- Displacements ---
+
+    def _check_displacement(self, j: int, high: float, low: float, volume: float, atr: float,
+                            events: List[StructureEvent]) -> None:
+        self.volumes.append(volume)
+        if len(self.volumes) < self.VOLUME_WINDOW:
+            return
+        # Exact window statistics (not running sums) so the numbers match the batch bit for bit
+        window = np.array(self.volumes)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            atr_mag = np.float64(high - low) / np.float64(atr)
+            vol_z = (np.float64(volume) - window.mean()) / window.std(ddof=1)
+        if not (atr_mag >= self.min_atr_magnitude and vol_z >= self.min_volume_z):
+            return
+
+        bar = self._bar(j)
+        events.append(DisplacementEvent(
+            key=event_key(id_kind(EventType.DISPLACEMENT, Direction.NEUTRAL), bar['time']),
+            event_type=EventType.DISPLACEMENT,
+            start_bar=bar['time'],
+            end_bar=bar['time'],
+            confirmed_at=bar['time'],
+            direction=Direction.BULLISH if bar['close'] > bar['open'] else Direction.BEARISH,
+            confidence_score=min(1.0, atr_mag / 5.0),
+            context=self._context(bar, Regime.EXPANSION, self._vwap_distance(bar)),
+            magnitude_atr=float(atr_mag),
+            volume_z_score=float(vol_z),
+            closing_price=bar['close']
+        ))
+
+    # --- Compressions ---
+
+    def _update_compression(self, j: int, high: float, low: float, atr: float, events: List[StructureEvent]) -> None:
+        tr = high - low
+        self.ranges.append(tr)
+        compressed = len(self.ranges) == self.min_bars and sum(self.ranges) / self.min_bars < atr * self.max_atr_ratio
+
+        if compressed:
+            if self.block is None:
+                # The first bar's time is kept here: a long block outlives the bar buffer
+                self.block = {'start_time': self.bars[-1]['time'], 'tr': [], 'atr': []}
+            self.block['tr'].append(tr)
+            self.block['atr'].append(atr)
+        elif self.block is not None:
+            # The block ended on the previous bar
+            events.append(self._compression_event(j - 1))
+            self.block = None
+
+    def _compression_event(self, end: int) -> CompressionEvent:
+        block = self.block
+        start_time = block['start_time']
+        end_bar = self._bar(end)
+        avg_tr = np.array(block['tr']).mean()
+        mean_atr = np.array(block['atr']).mean()
+        # Each compressed bar says "the last min_bars were quiet"
+        duration_bars = len(block['tr']) + self.min_bars - 1
+        return CompressionEvent(
+            key=event_key(id_kind(EventType.COMPRESSION, Direction.NEUTRAL), start_time),
+            event_type=EventType.COMPRESSION,
+            start_bar=start_time,
+            end_bar=end_bar['time'],
+            confirmed_at=end_bar['time'],
+            direction=Direction.NEUTRAL,
+            confidence_score=min(1.0, duration_bars / 20.0),
+            context=self._context(end_bar, Regime.LOW_VOL, self._vwap_distance(end_bar)),
+            bar_count=duration_bars,
+            average_true_range=float(avg_tr),
+            compression_ratio=float(avg_tr / mean_atr) if mean_atr > 0 else 0
+        )
+
+    # --- Context ---
+
+    @staticmethod
+    def _vwap_distance(bar: Dict[str, Any]) -> float:
+        return (bar['close'] - bar['vwap']) / bar['atr'] if bar['atr'] > 0 else 0
+
+    @staticmethod
+    def _context(bar: Dict[str, Any], regime: Regime, vwap_distance: float) -> ContextTags:
+        return context_tags(Session(bar['session']), regime, bar['time'].strftime('%H:%M'),
+                            bar['time'].dayofweek, vwap_distance)
+
+
+if __name__ == "__main__":
+    # Parity test: online (bar by bar) vs batch extractor on the same history
+    from time import perf_counter
+    import pandas as pd
+    from data_loader import DataLoader
+    from structure import StructureExtractor
+
+    def check_parity(df: pd.DataFrame) -> Dict[str, List[StructureEvent]]:
+        print(f"Online parity over {len(df)} bars...")
+        online = OnlineStructureExtractor(min_reclaim_pts=0.25)
+        emitted_at = {}
+        streamed: Dict[EventType, List[StructureEvent]] = {}
+        t0 = perf_counter()
+        for bar in df[['time', 'open', 'high', 'low', 'close', 'volume', 'session', 'vwap']].to_dict('records'):
+            for e in online.push_bar(bar):
+                emitted_at[e.key] = bar['time']
+                streamed.setdefault(e.event_type, []).append(e)
+        for e in online.flush():
+            emitted_at[e.key] = df['time'].iloc[-1]
+            streamed.setdefault(e.event_type, []).append(e)
+        t_online = perf_counter() - t0
+
+        extractor = StructureExtractor(df)
+        swings = extractor.extract_swings()
+        batch = {
+            'swings': swings,
+            'compressions': extractor.extract_compressions(),
+            'displacements': extractor.extract_displacements(),
+            'sweeps': extractor.extract_sweeps(swings, min_reclaim_pts=0.25),
+        }
+        online_lists = {
+            'swings': sorted(streamed.get(EventType.SWING_HIGH, []) + streamed.get(EventType.SWING_LOW, []),
+                             key=lambda e: (e.start_bar, e.event_type != EventType.SWING_HIGH)),
+            'compressions': sorted(streamed.get(EventType.COMPRESSION, []), key=lambda e: e.start_bar),
+            'displacements': sorted(streamed.get(EventType.DISPLACEMENT, []), key=lambda e: e.start_bar),
+            'sweeps': sorted(streamed.get(EventType.LIQUIDITY_SWEEP, []),
+                             key=lambda e: (e.start_bar, e.direction != Direction.BEARISH)),
+        }
+        for name, events in batch.items():
+            same = [e.model_dump() for e in events] == [e.model_dump() for e in online_lists[name]]
+            lags = [emitted_at[e.key] - e.confirmed_at for e in online_lists[name]]
+            assert same, f"{name}: online events differ from batch"
+            assert all(lag >= pd.Timedelta(0) for lag in lags), f"{name}: emitted before confirmation"
+            late = sum(1 for lag in lags if lag > pd.Timedelta(0))
+            print(f"  {name:<14} {len(events):>7} identical | emitted after confirmed_at: {late}")
+        print(f"Online: {t_online:.2f}s ({1e6 * t_online / len(df):.1f} us/bar)")
+        return batch
+
+    loader = DataLoader(r"C:\Users\CEO\.gemini\antigravity\scratch\kaizen_1m_data_ibkr_2yr.csv")
+    df = loader.load_and_process()
+    check_parity(df)
+
+    # A compression longer than the online bar buffer: flatten 120 bars and recompute the features
+    quiet = df.iloc[:5000][['time', 'open', 'high', 'low', 'close', 'volume', 'session', 'trading_date']].copy()
+    flat = slice(2000, 2120)
+    quiet.iloc[flat, quiet.columns.get_indexer(['open', 'high', 'low', 'close'])] = quiet['close'].iloc[flat.start]
+    quiet = loader._add_features(quiet)
+    longest = max(e.bar_count for e in check_parity(quiet)['compressions'])
+    assert longest > OnlineStructureExtractor().bars.maxlen, longest
+    print(f"Longest compression: {longest} bars (buffer {OnlineStructureExtractor().bars.maxlen})")
@@ -0,0 +1,146 @@
+from time import perf_counter
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from indicators import SparseExtreme
+
+# Comparison of a value against a level, e.g. np.greater_equal (bar high reaches a target)
+Hit = Callable[[np.ndarray, np.ndarray], np.ndarray]
+
+
+class RangeIndex:
+    """
+    Range max / min queries over price columns ("highest high between bar i and bar j").
+
+    Doubling tables (indicators.SparseExtreme) are built lazily per (column, mode) the
+    first time they are asked for, up to the longest range needed so far: O(n log L)
+    to build, O(1) per range extreme and O(log L) per first-hit search. Every query is
+    batched - arrays of ranges in, an array out - so callers never loop over bars.
+
+    Ranges are inclusive: extreme('high', 'max', first, last) covers rows first..last.
+    NaN bars are skipped like a per-bar comparison would (NaN never hits a level, and an
+    extreme is NaN only if the whole range is); table(..., skipna=False) gives the
+    NaN-propagating tables of a pandas rolling window instead.
+
+    Usage:
+        ranges = RangeIndex.from_frame(df)
+        highs = ranges.extreme('high', 'max', entry + 1, entry + 60)
+        stop_bar = ranges.first_hit('close', 'min', entry + 1, entry + 61, stop, np.less)
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray]):
+        self.columns = {name: np.asarray(values, dtype=np.float64) for name, values in columns.items()}
+        self.n = len(next(iter(self.columns.values()))) if self.columns else 0
+        self._tables: Dict[Tuple[str, str, bool], SparseExtreme] = {}
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, columns=('high', 'low', 'close'), scale: float = 1.0) -> "RangeIndex":
+        """Index over frame columns (optionally multiplied by scale, e.g. ticks -> points)."""
+        if scale == 1.0:
+            return cls({c: df[c].to_numpy() for c in columns})
+        return cls({c: df[c].to_numpy() * scale for c in columns})
+
+    def table(self, column: str, mode: str, max_length: Optional[int] = None, skipna: bool = True) -> SparseExtreme:
+        """Doubling table of a column covering ranges up to max_length bars (default: all of them)."""
+        max_length = max(1, min(max_length or self.n, self.n))
+        table = self._tables.get((column, mode, skipna))
+        if table is None or table.max_length < max_length:
+            table = SparseExtreme(self.columns[column], max_length, mode, skipna)
+            self._tables[(column, mode, skipna)] = table
+        return table
+
+    def clear(self):
+        """Drops the built tables (each full-length table is n * log2(n) floats)."""
+        self._tables.clear()
+
+    # --- Batched queries ---
+
+    def extreme(self, column: str, mode: str, first: np.ndarray, last: np.ndarray) -> np.ndarray:
+        """Max / min of column over rows first[i]..last[i] (needs first <= last)."""
+        first = np.asarray(first, dtype=np.int64)
+        last = np.asarray(last, dtype=np.int64)
+        out = np.empty(len(first))
+        if len(first) == 0:
+            return out
+        table = self.table(column, mode, int((last - first).max()) + 1)
+        k = np.frexp(last - first + 1)[1].astype(np.int64) - 1 # floor(log2(length)), exact
+        for level in np.unique(k).tolist():
+            at = np.flatnonzero(k == level)
+            block = table.levels[level]
+            out[at] = table.ufunc(block[first[at]], block[last[at] - (1 << level) + 1])
+        return out
+
+    def max_high(self, first: np.ndarray, last: np.ndarray) -> np.ndarray:
+        return self.extreme('high', 'max', first, last)
+
+    def min_low(self, first: np.ndarray, last: np.ndarray) -> np.ndarray:
+        return self.extreme('low', 'min', first, last)
+
+    def first_hit(self, column: str, mode: str, start: np.ndarray, stop: Optional[np.ndarray],
+                  level: np.ndarray, hit: Hit, skipna: bool = True) -> np.ndarray:
+        """
+        First row j in [start[i], stop[i]) with hit(column[j], level[i]), or stop[i] if none
+        (stop=None searches to the end of the series). `mode` must make the test monotone
+        over a range: 'max' for > / >= tests, 'min' for < / <=.
+        A test that a NaN bar passes (e.g. "not >= level") needs skipna=False, so that a
+        block holding a NaN counts as a hit and gets searched.
+
+        Binary lifting over the doubling blocks: skip every block whose extreme still
+        misses the level, largest first, so each search is O(log(stop - start)) and all
+        of them run together.
+        """
+        start = np.asarray(start, dtype=np.int64)
+        pos = start.copy()
+        stop = np.full(len(pos), self.n, dtype=np.int64) if stop is None \
+            else np.minimum(np.asarray(stop, dtype=np.int64), self.n)
+        level = np.asarray(level, dtype=np.float64)
+        if len(pos) == 0:
+            return pos
+        table = self.table(column, mode, int(np.max(stop - start, initial=1)), skipna)
+        for k in range(len(table.levels) - 1, -1, -1):
+            block = table.levels[k] # block[i] = extreme of values[i : i + 2**k]
+            fits = np.flatnonzero(pos + (1 << k) <= stop)
+            if len(fits) == 0:
+                continue
+            miss = ~hit(block[pos[fits]], level[fits])
+            pos[fits[miss]] += 1 << k
+        return np.minimum(pos, stop)
+
+
+if __name__ == "__main__":
+    # Test run: batched range queries vs direct slices on the full history
+    from data_loader import DataLoader
+
+    loader = DataLoader(r"C:\Users\CEO\.gemini\antigravity\scratch\kaizen_1m_data_ibkr_2yr.csv")
+    df = loader.load_and_process()
+    ranges = RangeIndex.from_frame(df)
+    high, close = df['high'].to_numpy(), df['close'].to_numpy()
+
+    rng = np.random.default_rng(0)
+    first = rng.integers(0, len(df) - 1, 100_000)
+    last = np.minimum(first + rng.integers(0, 500, len(first)), len(df) - 1)
+
+    t0 = perf_counter()
+    highs = ranges.max_high(first, last)
+    t1 = perf_counter()
+    targets = close[first] + rng.uniform(0, 20, len(first))
+    hits = ranges.first_hit('high', 'max', first, last + 1, targets, np.greater_equal)
+    t2 = perf_counter()
+    print(f"{len(first)} range maxima in {t1 - t0:.3f}s (incl. build), first hits in {t2 - t1:.3f}s")
+
+    for i in rng.choice(len(first), 2000, replace=False).tolist():
+        window = high[first[i]:last[i] + 1]
+        assert highs[i] == window.max()
+        reached = np.flatnonzero(window >= targets[i])
+        assert hits[i] == (first[i] + reached[0] if len(reached) else last[i] + 1)
+    print("Sampled queries match direct slices")
+
+    # NaN bars never hit and never hide a hit elsewhere in their block
+    gappy = RangeIndex({'high': [1, 1, 1, np.nan, 5, 1, 1, 1]})
+    assert gappy.first_hit('high', 'max', [0], [8], [4.0], np.greater_equal).tolist() == [4]
+    assert gappy.first_hit('high', 'max', [0], [8], [6.0], np.greater_equal).tolist() == [8]
+    spans = gappy.extreme('high', 'max', [0, 3], [7, 3])
+    assert spans[0] == 5 and np.isnan(spans[1])
+    print("NaN bars handled like the per-bar loop")
@@ -1,7 +1,7 @@
 from enum import Enum
-from typing import List, Optional, Dict, Any, Union
-from pydantic import BaseModel, Field
-from datetime import datetime
+from typing import List, Optional, Dict, Any, Tuple, Union
+from pydantic import BaseModel, ConfigDict, Field, computed_field
+from datetime import datetime, tzinfo
 
 # --- Enums ---
 
@@ -33,21 +33,75 @@ class Regime(str, Enum):
     EXPANSION = "EXPANSION"
     CHOP = "CHOP"
 
+# --- Event IDs ---
+# Events are identified by a compact integer key: bar open (epoch seconds) << 4 | id kind.
+# The string form ("SW-H-2024-03-14T22:29:00-04:00") is only built when asked for.
+
+ID_PREFIXES: List[str] = [
+    "SW-H", "SW-L", "COMP", "DISP", "SWEEP-H", "SWEEP-L",
+    "FVG", "SESSION_HIGH_SWEEP", "SESSION_LOW_SWEEP", "FAILED_BREAKOUT",
+]
+ID_KIND_BITS = 4
+ID_KIND_MASK = (1 << ID_KIND_BITS) - 1
+
+_ID_KINDS = {
+    EventType.SWING_HIGH: 0, EventType.SWING_LOW: 1, EventType.COMPRESSION: 2, EventType.DISPLACEMENT: 3,
+    EventType.FVG: 6, EventType.SESSION_HIGH_SWEEP: 7, EventType.SESSION_LOW_SWEEP: 8, EventType.FAILED_BREAKOUT: 9,
+}
+
+def id_kind(event_type: EventType, direction: Direction) -> int:
+    """Position in ID_PREFIXES. Liquidity sweeps are split by the side raided (bearish = a high)."""
+    if event_type == EventType.LIQUIDITY_SWEEP:
+        return 4 if direction == Direction.BEARISH else 5
+    return _ID_KINDS[event_type]
+
+def event_key(kind: int, bar_time: datetime) -> int:
+    return (int(bar_time.timestamp()) << ID_KIND_BITS) | kind
+
+def event_id(key: int, tz: Optional[tzinfo] = None) -> str:
+    """String ID of an event key, with the bar time rendered in `tz`."""
+    return f"{ID_PREFIXES[key & ID_KIND_MASK]}-{datetime.fromtimestamp(key >> ID_KIND_BITS, tz).isoformat()}"
+
 # --- Base Structures ---
 
 class ContextTags(BaseModel):
+    # Immutable: identical contexts are shared between events (see context_tags)
+    model_config = ConfigDict(frozen=True)
+
     session: Session
     regime: Regime
     time_of_day: str  # HH:MM
     day_of_week: int
     distance_to_vwap_std: float # Distance in std devs
 
+_CONTEXTS: Dict[Tuple, ContextTags] = {}
+
+def context_tags(session: Session, regime: Regime, time_of_day: str, day_of_week: int,
+                 distance_to_vwap_std: float = 0.0, validate: bool = True) -> ContextTags:
+    """
+    Flyweight ContextTags: contexts at VWAP distance 0 (swings, sweeps) share one instance
+    per (session, regime, minute, weekday), so at most a few thousand are ever kept.
+    A nonzero distance is almost unique per event and gets its own, uncached instance.
+    validate=False skips pydantic validation for already-typed inputs; those are only
+    shared when the session is a real Session (an unknown bar label gives None).
+    """
+    make = ContextTags if validate else ContextTags.model_construct
+    if distance_to_vwap_std != 0.0 or not (validate or isinstance(session, Session)):
+        return make(session=session, regime=regime, time_of_day=time_of_day,
+                    day_of_week=day_of_week, distance_to_vwap_std=distance_to_vwap_std)
+    key = (session, regime, time_of_day, day_of_week)
+    tags = _CONTEXTS.get(key)
+    if tags is None:
+        tags = _CONTEXTS[key] = make(session=session, regime=regime, time_of_day=time_of_day,
+                                     day_of_week=day_of_week, distance_to_vwap_std=0.0)
+    return tags
+
 class StructureEvent(BaseModel):
     """
     Base class for all market structure events.
     These are FACTS extracted from price action, not signals.
     """
-    id: str = Field(..., description="Unique ID for the event instance")
+    key: int = Field(..., description="Compact unique ID for the event instance (see event_key)")
     event_type: EventType
     start_bar: datetime
     end_bar: datetime
@@ -57,6 +111,12 @@ class StructureEvent(BaseModel):
     context: ContextTags
     metadata: Dict[str, Any] = Field(default_factory=dict)
 
+    @computed_field
+    @property
+    def id(self) -> str:
+        """String ID, e.g. SW-H-2024-03-14T22:29:00-04:00 (built on access, not stored)."""
+        return event_id(self.key, self.start_bar.tzinfo)
+
 # --- Concrete Events ---
 
 class SwingEvent(StructureEvent):
@@ -77,13 +137,31 @@ class DisplacementEvent(StructureEvent):
 class LiquiditySweepEvent(StructureEvent):
     swept_level: float
     sweep_depth: float
-    swing_id: str
+    swing_key: int # key of the swept SwingEvent
     is_major: bool
     reclaim_time_bars: int = 0 # Default to 0 for instantaneous sweep
+
+    @computed_field
+    @property
+    def swing_id(self) -> str:
+        return event_id(self.swing_key, self.start_bar.tzinfo)
     
+class FVGEvent(StructureEvent):
+    """Three-bar fair value gap: bar 1 and bar 3 do not overlap."""
+    gap_high: float
+    gap_low: float
+    gap_atr: float # Gap size in ATR multiples
+
+class SessionSweepEvent(StructureEvent):
+    """First raid of the previous session's high / low that closes back inside."""
+    swept_level: float
+    sweep_depth: float
+    swept_session: Session
+
 class FailedBreakoutEvent(StructureEvent):
     level_price: float
     failure_mode: str # e.g., "IMMEDIATE_REVERSAL", "GRIND_BACK"
+    reclaim_time_bars: int = 0 # Bars from the breakout close to the close back inside
 
 # --- Reasoning Layer ---
 
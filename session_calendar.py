@@ -0,0 +1,102 @@
+from datetime import time
+from typing import List
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.holiday import (
+    AbstractHolidayCalendar, Holiday, GoodFriday, USMartinLutherKingJr, USPresidentsDay,
+    USMemorialDay, USLaborDay, USThanksgivingDay, nearest_workday, sunday_to_monday
+)
+
+MINUTES_PER_DAY = 24 * 60
+
+# Session labels, in code order (code = index). Values match schema.Session.
+SESSION_LABELS: List[str] = ["ASIA", "LONDON", "NY_AM", "NY_PM", "OTHER"]
+SESSION_CODES = {label: code for code, label in enumerate(SESSION_LABELS)}
+
+
+class ExchangeHolidayCalendar(AbstractHolidayCalendar):
+    """
+    US equity index futures full-holiday calendar (the days the RTH session does not trade).
+    Globex still prints an abbreviated session on most of these, which is exactly why
+    we flag them instead of dropping them.
+    """
+    rules = [
+        Holiday('NewYearsDay', month=1, day=1, observance=sunday_to_monday),
+        USMartinLutherKingJr,
+        USPresidentsDay,
+        GoodFriday,
+        USMemorialDay,
+        Holiday('Juneteenth', month=6, day=19, start_date='2022-01-01', observance=nearest_workday),
+        Holiday('IndependenceDay', month=7, day=4, observance=nearest_workday),
+        USLaborDay,
+        USThanksgivingDay,
+        Holiday('Christmas', month=12, day=25, observance=nearest_workday),
+    ]
+
+
+def _minute(t: time) -> int:
+    return t.hour * 60 + t.minute
+
+
+def build_session_table(asia_start: time, london_start: time, ny_start: time,
+                        ny_pm_start: time, ny_end: time) -> np.ndarray:
+    """
+    Precomputes the session code of every minute of the (NY) day.
+    Tagging a bar is then a single array lookup: table[minute_of_day].
+
+    Boundaries follow the original loader:
+        ASIA   : 18:00 - 03:00 (crosses midnight)
+        LONDON : 03:00 - 09:30
+        NY_AM  : 09:30 - ny_pm_start
+        NY_PM  : ny_pm_start - 17:00 (17:00 inclusive)
+        OTHER  : everything else (maintenance break)
+    """
+    table = np.full(MINUTES_PER_DAY, SESSION_CODES["OTHER"], dtype=np.uint8)
+    minutes = np.arange(MINUTES_PER_DAY)
+
+    table[(minutes >= _minute(asia_start)) | (minutes < _minute(london_start))] = SESSION_CODES["ASIA"]
+    table[(minutes >= _minute(london_start)) & (minutes < _minute(ny_start))] = SESSION_CODES["LONDON"]
+    table[(minutes >= _minute(ny_start)) & (minutes < _minute(ny_pm_start))] = SESSION_CODES["NY_AM"]
+    table[(minutes >= _minute(ny_pm_start)) & (minutes <= _minute(ny_end))] = SESSION_CODES["NY_PM"]
+    return table
+
+
+def local_minutes(times: pd.Series) -> np.ndarray:
+    """
+    Wall-clock minutes since epoch in the series' own timezone (int64).
+    Everything else in the calendar is integer arithmetic on this array.
+    """
+    wall = times.dt.tz_localize(None) if times.dt.tz is not None else times
+    return wall.to_numpy().astype('datetime64[m]').astype(np.int64)
+
+
+def holiday_flags(trading_days: np.ndarray):
+    """
+    Returns (is_holiday, is_early_close) boolean arrays for an array of
+    trading days (int64 days since epoch).
+
+    Early closes: day before Independence Day, day after Thanksgiving, Christmas Eve.
+    """
+    n = len(trading_days)
+    if n == 0:
+        return np.zeros(0, dtype=bool), np.zeros(0, dtype=bool)
+
+    first = pd.Timestamp(int(trading_days.min()), unit='D')
+    last = pd.Timestamp(int(trading_days.max()), unit='D')
+    holidays = ExchangeHolidayCalendar().holidays(start=first - pd.Timedelta(days=7), end=last + pd.Timedelta(days=7))
+    holiday_days = holidays.to_numpy().astype('datetime64[D]').astype(np.int64)
+
+    early = []
+    for year in range(first.year, last.year + 1):
+        thanksgiving = USThanksgivingDay.dates(f"{year}-01-01", f"{year}-12-31")
+        early.extend(d + pd.Timedelta(days=1) for d in thanksgiving)
+        early.append(pd.Timestamp(year, 7, 3))
+        early.append(pd.Timestamp(year, 12, 24))
+    early_days = np.array([d.to_datetime64().astype('datetime64[D]').astype(np.int64)
+                           for d in early if d.dayofweek < 5], dtype=np.int64)
+    early_days = np.setdiff1d(early_days, holiday_days)
+
+    # Unique-then-broadcast: only a few hundred distinct days for multi-year data
+    uniq, inverse = np.unique(trading_days, return_inverse=True)
+    return np.isin(uniq, holiday_days)[inverse], np.isin(uniq, early_days)[inverse]
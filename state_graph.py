@@ -1,7 +1,102 @@
-from typing import List, Dict, Optional
+from typing import Dict, Iterator, List, Mapping, Optional, Union
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
+from datetime import timedelta
 from schema import MarketState, StructureEvent, SwingEvent, EventType, Regime, Session, Direction
+from data_loader import price_scale
+from events import EventTable, EVENT_CODES, REGIMES, REGIME_CODES
+from levels import LevelIndex
+from level_book import LevelBook
+
+SESSIONS: List[Session] = list(Session)
+VWAP_RELATIONS = ["ABOVE", "BELOW", "TOUCHING"]
+
+
+class StateStore(Mapping):
+    """
+    Columnar MarketState graph: timestamp -> MarketState, without one model per bar.
+
+    Per bar:
+        session, regime, vwap_relation : int8 codes (SESSIONS, REGIMES, VWAP_RELATIONS)
+        support, resistance            : nearest levels in points (NaN = None)
+        recent_end                     : recent events are event_rows[max(0, end - RECENT) : end]
+        active_version                 : active swings are version v's slice of active_rows
+    Active swing lists only change on a few bars, so each distinct list is stored once
+    (active_offsets[v] : active_offsets[v + 1] into active_rows / active_tested), and
+    all rows point into one shared EventTable.
+
+    store[t] materializes a MarketState on access (event models come from the table's
+    cache; a tested swing is a copy carrying its tested_count as of that bar, shared by
+    every state that shows it).
+    """
+
+    RECENT = 20       # Recent events kept per state
+    ACTIVE_SHOWN = 10 # Active swings stored on a state (the most recent ones)
+
+    def __init__(self, times: pd.Series, events: EventTable, event_rows: np.ndarray, columns: Dict[str, np.ndarray],
+                 active_offsets: np.ndarray, active_rows: np.ndarray, active_tested: np.ndarray):
+        self.times = pd.DatetimeIndex(times)
+        self.events = events
+        self.event_rows = event_rows
+        self.columns = columns
+        self.active_offsets = active_offsets
+        self.active_rows = active_rows
+        self.active_tested = active_tested
+        self._tested_models = {} # (event row, tested_count) -> model copy
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def __iter__(self) -> Iterator[pd.Timestamp]:
+        return iter(self.times)
+
+    def __contains__(self, t) -> bool:
+        try:
+            self.times.get_loc(t)
+        except (KeyError, TypeError, ValueError):
+            return False
+        return True
+
+    def __getitem__(self, t) -> MarketState:
+        try:
+            i = self.times.get_loc(t)
+        except (TypeError, ValueError):
+            raise KeyError(t)
+        return self.state_at(i)
+
+    def state_at(self, i: int) -> MarketState:
+        c = self.columns
+        end = int(c['recent_end'][i])
+        version = c['active_version'][i]
+        a, b = self.active_offsets[version], self.active_offsets[version + 1]
+        swings = self.events.to_events(self.active_rows[a:b])
+        for k, tested in enumerate(self.active_tested[a:b].tolist()):
+            if tested:
+                swings[k] = self._tested(int(self.active_rows[a + k]), tested, swings[k])
+        support, resistance = c['support'][i], c['resistance'][i]
+        return MarketState(
+            timestamp=self.times[i],
+            session=SESSIONS[c['session'][i]],
+            regime=REGIMES[c['regime'][i]],
+            active_swings=swings,
+            recent_events=self.events.to_events(self.event_rows[max(0, end - self.RECENT):end]),
+            price_relation_to_vwap=VWAP_RELATIONS[c['vwap_relation'][i]],
+            nearest_support=None if np.isnan(support) else float(support),
+            nearest_resistance=None if np.isnan(resistance) else float(resistance),
+        )
+
+    def _tested(self, row: int, tested: int, model: SwingEvent) -> SwingEvent:
+        key = (row, tested)
+        if key not in self._tested_models:
+            self._tested_models[key] = model.model_copy(update={'tested_count': tested})
+        return self._tested_models[key]
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the store's own arrays (the shared event table not included)."""
+        arrays = [self.event_rows, self.active_offsets, self.active_rows, self.active_tested, *self.columns.values()]
+        return sum(a.nbytes for a in arrays) + self.times.nbytes
+
 
 class StateBuilder:
     """
@@ -9,122 +104,160 @@ class StateBuilder:
     This creates the "Graph" that the hypothesis engine traverses.
     """
     
-    def __init__(self, df: pd.DataFrame, events: List[StructureEvent]):
+    def __init__(self, df: pd.DataFrame, events: Union[List[StructureEvent], EventTable]):
         self.df = df.sort_values('time').reset_index(drop=True)
+        # Compact frames carry prices in ticks; swing levels are in points
+        self.price_scale = price_scale(df)
+
         # We index by CONFIRMED_AT to prevent lookahead
-        self.events = sorted(events, key=lambda x: x.confirmed_at)
-        
-        # Index events by confirmation time for fast lookup during iteration
-        self.events_by_confirmation = {}
-        for e in self.events:
-            t = e.confirmed_at
-            if t not in self.events_by_confirmation:
-                self.events_by_confirmation[t] = []
-            self.events_by_confirmation[t].append(e)
-
-    def build_states(self) -> Dict[datetime, MarketState]:
+        # One shared table in confirmation order (stable: same-bar events keep their order)
+        if isinstance(events, EventTable):
+            self.events = events.sort('confirmed_idx')
+        else:
+            self.events = EventTable.from_events(sorted(events, key=lambda x: x.confirmed_at), self.df['time'])
+        # Events are ingested on the bar of their confirmation time; the ingestion order is
+        # table order, so "events confirmed up to bar i" is a prefix of event_rows
+        conf_pos = pd.DatetimeIndex(self.df['time']).get_indexer(self.events.times_of('confirmed_idx'))
+        conf_pos[self.events['confirmed_idx'] < 0] = -1
+        self.event_rows = np.flatnonzero(conf_pos >= 0)
+        self.event_bars = conf_pos[self.event_rows]
+
+        # Swing lifecycles (invalidation bar, tests) for the whole history in one pass,
+        # on this frame's rows (the table may come from another frame, e.g. the full history)
+        self.levels = LevelIndex(self.df, self.events, conf_pos)
+        # Source row -> level position, and the levels whose test starts at each bar
+        self.level_of_row = dict(zip(self.levels.table_row.tolist(), range(len(self.levels))))
+        self.tests_by_bar = {}
+        for level, bar in zip(self.levels.touch_level.tolist(), self.levels.touch_start.tolist()):
+            self.tests_by_bar.setdefault(bar, []).append(level)
+
+    def build_states(self) -> StateStore:
         """
-        Iterates through the dataframe and builds a MarketState for every bar.
-        Returns a dictionary for O(1) lookup by timestamp.
+        Iterates through the bars and records the MarketState of every one of them in
+        a columnar StateStore (a timestamp -> MarketState mapping, O(1) lookup).
         """
-        states = {}
+        df = self.df
+        n = len(df)
+        columns = {
+            'session': pd.Categorical(df['session'], categories=[s.value for s in SESSIONS]).codes.astype(np.int8),
+            'support': np.full(n, np.nan),
+            'resistance': np.full(n, np.nan),
+            # Events confirmed up to each bar (the log is the last RECENT of them)
+            'recent_end': np.searchsorted(self.event_bars, np.arange(n), side='right').astype(np.int32),
+            'active_version': np.zeros(n, dtype=np.int32),
+        }
+        # Bar-local fields are whole-array operations; only the active swings need the loop
+        columns['regime'] = self.regime_codes(columns['recent_end'])
+        columns['vwap_relation'] = self.vwap_relation_codes()
+        # Distinct active swing lists (version 0 = none)
+        active_offsets: List[int] = [0, 0]
+        active_rows: List[int] = []
+        active_tested: List[int] = []
         
         # State tracking variables
-        active_swings: List[SwingEvent] = [] 
-        recent_events_log: List[StructureEvent] = [] # Keep last N
+        book = LevelBook(capacity=50) # Active swings by LevelIndex position, price-sorted
+        tested: Dict[int, int] = {}   # tested_count of the active swings tested so far
+        version = 0
         
-        # Iterate
-        # Note: In a production engine, this loop is the bottleneck. 
-        # For research on 1m bars (100k+ rows), it might take a few seconds in Python.
-        # Acceptable for now.
+        print(f"Building states for {n} bars...")
         
-        print(f"Building states for {len(self.df)} bars...")
+        close = (df['close'].to_numpy() * self.price_scale).tolist()
+        event_type = self.events['event_type'][self.event_rows].tolist()
+        recent_end = columns['recent_end'].tolist()
+        table_row = self.levels.table_row
+        level_price = self.levels.level.tolist()
+        level_high = self.levels.is_high.tolist()
+        swing_codes = {EVENT_CODES[EventType.SWING_HIGH], EVENT_CODES[EventType.SWING_LOW]}
+        support, resistance = columns['support'], columns['resistance']
         
-        for idx, row in self.df.iterrows():
-            curr_time = row['time']
-            curr_close = row['close']
-            curr_session = Session(row['session']) if row['session'] in ["ASIA", "LONDON"] else Session.OTHER
+        for idx in range(n):
+            curr_close = close[idx]
+            changed = False
             
             # 1. Update Active Swings (Invalidation Logic)
             # A Swing High is invalidated if Price closes > Swing Price (conceptually)
             # A Swing Low is invalidated if Price closes < Swing Price
             # We keep only 'Active' structure.
-            
-            # Filter active swings
-            next_active_swings = []
-            for s in active_swings:
-                if s.event_type == EventType.SWING_HIGH:
-                    if curr_close <= s.price_level: # Still valid
-                        next_active_swings.append(s)
-                elif s.event_type == EventType.SWING_LOW:
-                    if curr_close >= s.price_level: # Still valid
-                        next_active_swings.append(s)
-            
-            active_swings = next_active_swings
+            for level in book.invalidate(curr_close):
+                tested.pop(level, None)
+                changed = True
+
+            # Swings tested on this bar
+            for level in self.tests_by_bar.get(idx, ()):
+                if level in book:
+                    tested[level] = int(self.levels.tested_count(level, idx))
+                    changed = True
             
             # 2. Ingest New Events occurring AT this bar (Confirmation Time)
-            if curr_time in self.events_by_confirmation:
-                new_events = self.events_by_confirmation[curr_time]
-                for e in new_events:
-                    # Add to Log
-                    recent_events_log.append(e)
-                    
-                    # If it's a swing, add to active structure
-                    if isinstance(e, SwingEvent):
-                        active_swings.append(e)
-            
-            # Clean Active Swings (Keep only nearest/relevant? Or all?)
-            # For now, keep all validated ones. 
-            # Optimization: Only keep last 20?
-            if len(active_swings) > 50:
-                active_swings = active_swings[-50:]
-                
-            # Maintain Recent Events Log (e.g. last 20 items)
-            if len(recent_events_log) > 20:
-                recent_events_log = recent_events_log[-20:]
-                
-            # 3. Determine Regime
-            # Simple heuristic for now using ATR or recent compression
-            # (Ideally, Regime is its own EventType, but let's derive it)
-            regime = Regime.CHOP
-            if any(e.event_type == EventType.DISPLACEMENT for e in recent_events_log[-3:]):
-                regime = Regime.EXPANSION
-            elif any(e.event_type == EventType.COMPRESSION for e in recent_events_log[-3:]):
-                regime = Regime.LOW_VOL
+            # (the recent events log is just the prefix end, see recent_end)
+            first, end = (recent_end[idx - 1] if idx else 0), recent_end[idx]
+            for k in range(first, end):
+                # If it's a swing, add to active structure
+                if event_type[k] in swing_codes:
+                    level = self.level_of_row[int(self.event_rows[k])]
+                    # Keep the 50 most recent validated swings
+                    for dropped in book.add(level, level_price[level], level_high[level]):
+                        tested.pop(dropped, None)
+                    changed = True
+
+            if changed:
+                shown = book.newest(StateStore.ACTIVE_SHOWN) # Just store references to last 10 relevant
+                active_rows.extend(table_row[shown].tolist())
+                active_tested.extend(tested.get(level, 0) for level in shown)
+                active_offsets.append(len(active_rows))
+                version = len(active_offsets) - 2
+            columns['active_version'][idx] = version
                 
-            # 4. Nearest Support/Resistance (Simple scan of active swings)
+            # 3. Nearest Support/Resistance
             # Resistance: Lowest Swing High above current price
             # Support: Highest Swing Low below current price
-            
-            resistances = [s.price_level for s in active_swings if s.event_type == EventType.SWING_HIGH and s.price_level > curr_close]
-            supports = [s.price_level for s in active_swings if s.event_type == EventType.SWING_LOW and s.price_level < curr_close]
-            
-            nearest_resistance = min(resistances) if resistances else None
-            nearest_support = max(supports) if supports else None
-            
-            # 5. VWAP Relation
-            vwap_dist = "TOUCHING"
-            if row['vwap'] and row['atr'] > 0:
-                dist = (curr_close - row['vwap']) / row['atr']
-                if dist > 0.5: vwap_dist = "ABOVE"
-                elif dist < -0.5: vwap_dist = "BELOW"
-            
-            # Construct State Node
-            state = MarketState(
-                timestamp=curr_time,
-                session=curr_session,
-                regime=regime,
-                active_swings=active_swings[-10:], # Just store references to last 10 relevant
-                recent_events=recent_events_log,
-                price_relation_to_vwap=vwap_dist,
-                nearest_support=nearest_support,
-                nearest_resistance=nearest_resistance
-            )
-            
-            states[curr_time] = state
+            nearest = book.nearest_resistance(curr_close)
+            if nearest is not None: resistance[idx] = nearest
+            nearest = book.nearest_support(curr_close)
+            if nearest is not None: support[idx] = nearest
             
         print("State construction complete.")
-        return states
+        return StateStore(df['time'], self.events, self.event_rows, columns,
+                          np.asarray(active_offsets, dtype=np.int64), np.asarray(active_rows, dtype=np.int64),
+                          np.asarray(active_tested, dtype=np.int32))
+
+    def regime_codes(self, recent_end: np.ndarray) -> np.ndarray:
+        """
+        Regime of every bar from the last 3 events confirmed up to it (recent_end = how many):
+        a displacement among them -> EXPANSION, else a compression -> LOW_VOL, else CHOP.
+        Simple heuristic for now (ideally, Regime is its own EventType). The trailing
+        window runs over the confirmation order, so it is a difference of cumulative counts.
+        """
+        event_type = self.events['event_type'][self.event_rows]
+        end = np.asarray(recent_end, dtype=np.int64)
+        start = np.maximum(end - 3, 0)
+
+        def seen(code: int) -> np.ndarray:
+            count = np.r_[0, np.cumsum(event_type == code)]
+            return count[end] > count[start]
+
+        return np.select(
+            [seen(EVENT_CODES[EventType.DISPLACEMENT]), seen(EVENT_CODES[EventType.COMPRESSION])],
+            [REGIME_CODES[Regime.EXPANSION], REGIME_CODES[Regime.LOW_VOL]],
+            REGIME_CODES[Regime.CHOP],
+        ).astype(np.int8)
+
+    def vwap_relation_codes(self) -> np.ndarray:
+        """
+        ABOVE / BELOW when the close is more than 0.5 ATR from VWAP (unit-free, frame units),
+        TOUCHING otherwise or without a usable VWAP / ATR (codes index VWAP_RELATIONS).
+        """
+        close = self.df['close'].to_numpy(dtype=np.float64)
+        vwap = self.df['vwap'].to_numpy(dtype=np.float64)
+        atr = self.df['atr'].to_numpy(dtype=np.float64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            # A NaN VWAP passes the old truthiness check (and then compares False)
+            usable = (vwap != 0) & (atr > 0)
+            dist = (close - vwap) / atr
+        relation = np.full(len(close), VWAP_RELATIONS.index("TOUCHING"), dtype=np.int8)
+        relation[usable & (dist > 0.5)] = VWAP_RELATIONS.index("ABOVE")
+        relation[usable & (dist < -0.5)] = VWAP_RELATIONS.index("BELOW")
+        return relation
 
 if __name__ == "__main__":
     from data_loader import DataLoader
@@ -155,3 +288,19 @@ if __name__ == "__main__":
         print(f"  Active Swings: {len(s.active_swings)}")
         print(f"  Nearest Supp: {s.nearest_support}")
         print(f"  Nearest Res: {s.nearest_resistance}")
+        print(f"  Tested counts: {[sw.tested_count for sw in s.active_swings]}")
+    print(f"StateStore: {len(states)} states in {states.nbytes / 1024:.0f} KiB "
+          f"({len(states.active_offsets) - 1} distinct active swing lists)")
+
+    # Events from a longer history over a slice of it (a StructureCache table with a
+    # load_range frame): the table path must match models rebased onto the slice by time
+    history = df.head(6000)
+    table = StructureExtractor(history).swing_table()
+    window = history.iloc[3000:]
+    by_table = StateBuilder(window, table).build_states()
+    by_models = StateBuilder(window, list(table)).build_states()
+    for t in window['time'].iloc[::25]:
+        a, b = by_table[t], by_models[t]
+        assert (a.nearest_support, a.nearest_resistance) == (b.nearest_support, b.nearest_resistance), t
+        assert [(e.key, e.tested_count) for e in a.active_swings] == [(e.key, e.tested_count) for e in b.active_swings], t
+    print(f"Sliced frame: {len(window)} states match the rebased event models")
@@ -1,13 +1,26 @@
-from typing import List
+from typing import Dict, Iterable, List, Tuple, Union
 import pandas as pd
 import numpy as np
 from datetime import timedelta
-from schema import StructureEvent, SwingEvent, CompressionEvent, DisplacementEvent, LiquiditySweepEvent, EventType, Direction, ContextTags, Regime, Session
+from schema import (
+    StructureEvent, SwingEvent, CompressionEvent, DisplacementEvent, LiquiditySweepEvent, FVGEvent,
+    SessionSweepEvent, FailedBreakoutEvent, EventType, Direction, Regime, Session
+)
+from data_loader import price_scale
+from events import EventTable, EVENT_CODES, DIRECTION_CODES, REGIME_CODES
+from indicators import sma, rolling_std, segment_accumulate, segment_mean, segment_starts, SparseExtreme
+from range_index import RangeIndex
+from session_calendar import SESSION_LABELS, MINUTES_PER_DAY, local_minutes
+
+# Bump when an extractor's output changes (invalidates the structure cache)
+STRUCTURE_VERSION = "2"
 
 class StructureExtractor:
     """
     Extracts deterministic market structure events from normalized data.
     """
+
+    VOLUME_WINDOW = 20 # Displacement volume z-score lookback
     
     def __init__(self, df: pd.DataFrame):
         self.df = df
@@ -15,100 +28,154 @@ class StructureExtractor:
         # Ensure strict datetime sorting
         self.df = self.df.sort_values('time').reset_index(drop=True)
 
+        # Compact frames carry prices in ticks; events always report points
+        self.price_scale = price_scale(df)
+        self._context = None
+        self._time_asi8 = None
+        self._local_ranges = {}
+        self._levels = None
+        # Range max / min over the bars (pivot windows); tables are built on first use
+        self.ranges = RangeIndex.from_frame(self.df, columns=('high', 'low'))
+
     def extract_swings(self, left_bars: int = 5, right_bars: int = 5, major_factor: int = 3) -> List[SwingEvent]:
         """
         Identifies Standard Pivot Highs and Lows.
         Major Check: Is it also a pivot for [left*factor, right*factor]?
+        Detection is vectorized (see swing_arrays); this only materializes the events.
+        """
+        return self.swing_table(left_bars, right_bars, major_factor).to_events()
+
+    def swing_table(self, left_bars: int = 5, right_bars: int = 5, major_factor: int = 3) -> EventTable:
+        """Swings as an EventTable (models are only built for the rows that get used)."""
+        return self._swing_table(self.swing_arrays(left_bars, right_bars, major_factor))
+
+    def swing_grid(self, combinations: Iterable[Tuple[int, int, int]]) -> Dict[Tuple[int, int, int], EventTable]:
+        """
+        Swings for several (left_bars, right_bars, major_factor) combinations in one pass.
+        Returns {(left, right, factor): EventTable}, each identical to swing_table(left, right, factor).
+
+        Shared work: one sparse extreme table per side covers every window size, minor
+        pivots are computed once per window size (left + right, however it is split), and
+        the major check is only evaluated at the minor pivots.
+
+        Usage:
+            grid = extractor.swing_grid(itertools.product([3, 5], [3, 5], [2, 3]))
+            swings = grid[(5, 5, 3)]
+        """
+        combinations = [tuple(int(v) for v in c) for c in combinations]
+        if not combinations:
+            return {}
+        longest = max((left + right) * factor + 1 for left, right, factor in combinations)
+        longest = max(longest, max(left + right + 1 for left, right, _ in combinations))
+        extremes = self._swing_extremes(longest)
+        pivots = {} # window_size -> (high_pos, low_pos)
+        return {
+            (left, right, factor): self._swing_table(self._swing_arrays(left, right, factor, extremes, pivots))
+            for left, right, factor in dict.fromkeys(combinations)
+        }
+
+    def _swing_table(self, sw: Dict[str, np.ndarray]) -> EventTable:
+        is_high = sw['is_high']
+        return EventTable.build(
+            self.df['time'], self._bar_context(), len(is_high),
+            event_type=np.where(is_high, EVENT_CODES[EventType.SWING_HIGH], EVENT_CODES[EventType.SWING_LOW]),
+            direction=np.where(is_high, DIRECTION_CODES[Direction.BEARISH], DIRECTION_CODES[Direction.BULLISH]),
+            regime=REGIME_CODES[Regime.CHOP],
+            start_idx=sw['pos'],
+            end_idx=sw['pos'],
+            confirmed_idx=sw['confirm_pos'],
+            confidence=1.0,
+            vwap_dist=0.0,
+            price_level=sw['price_level'],
+            is_major=sw['is_major'],
+            tested_count=0,
+        )
+
+    def swing_arrays(self, left_bars: int = 5, right_bars: int = 5, major_factor: int = 3) -> Dict[str, np.ndarray]:
+        """
+        Pivot detection as array operations, one entry per swing in extract_swings order
+        (by bar time, highs before lows on the same bar):
+            pos          : row of the pivot bar
+            confirm_pos  : row at which it is confirmed (pos + right_bars)
+            is_high      : pivot high (else pivot low)
+            is_major     : also the extreme of the wider (major_factor) window
+            price_level  : pivot high / low in points
+        Windows are centered like pandas rolling(center=True), so edges without a full
+        window never pivot.
         """
-        swings = []
-        
         window_size = left_bars + right_bars + 1
         major_window = (left_bars * major_factor) + (right_bars * major_factor) + 1
-        
-        df = self.df.copy()
-        
-        # Minor Pivots
-        df['max_local'] = df['high'].rolling(window=window_size, center=True).max()
-        df['min_local'] = df['low'].rolling(window=window_size, center=True).min()
-        
-        # Major Pivots (Wider look)
-        df['max_major'] = df['high'].rolling(window=major_window, center=True).max()
-        df['min_major'] = df['low'].rolling(window=major_window, center=True).min()
-        
-        pivot_highs = df[df['high'] == df['max_local']]
-        pivot_lows = df[df['low'] == df['min_local']]
-        
-        for idx, row in pivot_highs.iterrows():
-            loc_idx = df.index.get_loc(idx)
-            conf_idx = loc_idx + right_bars
-            
-            if conf_idx >= len(df): continue
-                
-            conf_time = df.iloc[conf_idx]['time']
-            
-            # Major Check
-            # Ensure it is the max in the wider window
-            # Note: A Minor swing might NOT be the max of the wider window at the exact same center?
-            # Yes, if there is a higher high 10 bars away.
-            is_major = (row['high'] == row['max_major'])
-            
-            event_id = f"SW-H-{row['time'].isoformat()}"
-            context = ContextTags(
-                session=Session(row['session']) if row['session'] in ["ASIA", "LONDON"] else Session.OTHER, 
-                regime=Regime.CHOP,
-                time_of_day=row['time'].strftime('%H:%M'),
-                day_of_week=row['time'].dayofweek,
-                distance_to_vwap_std=0
-            )
-            
-            swing = SwingEvent(
-                id=event_id,
-                event_type=EventType.SWING_HIGH,
-                start_bar=row['time'],
-                end_bar=row['time'],
-                confirmed_at=conf_time,
-                direction=Direction.BEARISH, 
-                confidence_score=1.0, 
-                context=context,
-                price_level=row['high'],
-                is_major=is_major # Calculated
-            )
-            swings.append(swing)
-
-        for idx, row in pivot_lows.iterrows():
-            loc_idx = df.index.get_loc(idx)
-            conf_idx = loc_idx + right_bars
-            
-            if conf_idx >= len(df): continue
-
-            conf_time = df.iloc[conf_idx]['time']
-            is_major = (row['low'] == row['min_major'])
-
-            event_id = f"SW-L-{row['time'].isoformat()}"
-            context = ContextTags(
-                session=Session(row['session']) if row['session'] in ["ASIA", "LONDON"] else Session.OTHER,
-                regime=Regime.CHOP,
-                time_of_day=row['time'].strftime('%H:%M'),
-                day_of_week=row['time'].dayofweek,
-                distance_to_vwap_std=0
-            )
-            
-            swing = SwingEvent(
-                id=event_id,
-                event_type=EventType.SWING_LOW,
-                start_bar=row['time'],
-                end_bar=row['time'],
-                confirmed_at=conf_time, 
-                direction=Direction.BULLISH, 
-                confidence_score=1.0,
-                context=context,
-                price_level=row['low'],
-                is_major=is_major # Calculated
+        extremes = self._swing_extremes(max(window_size, major_window))
+        return self._swing_arrays(left_bars, right_bars, major_factor, extremes, {})
+
+    def _swing_extremes(self, max_length: int) -> Dict[str, SparseExtreme]:
+        return {
+            # NaN-propagating like the pandas rolling windows the pivots were defined on
+            'high': self.ranges.table('high', 'max', max_length, skipna=False),
+            'low': self.ranges.table('low', 'min', max_length, skipna=False),
+        }
+
+    def _swing_arrays(self, left_bars: int, right_bars: int, major_factor: int,
+                      extremes: Dict[str, SparseExtreme], pivots: Dict[int, tuple]) -> Dict[str, np.ndarray]:
+        window_size = left_bars + right_bars + 1
+        major_window = (left_bars * major_factor) + (right_bars * major_factor) + 1
+        high = extremes['high'].values
+        low = extremes['low'].values
+        n = len(high)
+
+        # Minor Pivots (NaN windows compare False). The centered window only depends on
+        # its size, so splits of the same left + right share them.
+        if window_size not in pivots:
+            pivots[window_size] = (
+                np.flatnonzero(high == extremes['high'].window(window_size, center=True)),
+                np.flatnonzero(low == extremes['low'].window(window_size, center=True)),
             )
-            swings.append(swing)
+        high_pos, low_pos = pivots[window_size]
+
+        # Major Pivots (Wider look) - only needed where there is a minor pivot
+        high_major = high[high_pos] == extremes['high'].at(high_pos, major_window, center=True)
+        low_major = low[low_pos] == extremes['low'].at(low_pos, major_window, center=True)
+
+        pos = np.r_[high_pos, low_pos]
+        is_high = np.r_[np.ones(len(high_pos), dtype=bool), np.zeros(len(low_pos), dtype=bool)]
+        is_major = np.r_[high_major, low_major]
+        price = np.r_[high[high_pos], low[low_pos]] * self.price_scale
+
+        # Not yet confirmed at the end of the data
+        keep = pos + right_bars < n
+        pos, is_high, is_major, price = pos[keep], is_high[keep], is_major[keep], price[keep]
 
-        swings.sort(key=lambda x: x.start_bar)
-        return swings
+        # Stable sort on bar time (highs were stacked first, so they stay first on ties)
+        order = np.argsort(self._time_keys()[pos], kind='stable')
+        return {
+            'pos': pos[order],
+            'confirm_pos': pos[order] + right_bars,
+            'is_high': is_high[order],
+            'is_major': is_major[order],
+            'price_level': price[order],
+        }
+
+    def _time_keys(self) -> np.ndarray:
+        """Bar times as int64 (sortable without going through Timestamp objects)."""
+        if self._time_asi8 is None:
+            self._time_asi8 = pd.DatetimeIndex(self.df['time']).asi8
+        return self._time_asi8
+
+    def _bar_context(self) -> Dict[str, np.ndarray]:
+        """Per-bar context fields (session enum, HH:MM, day of week), computed once."""
+        if self._context is None:
+            minutes = local_minutes(self.df['time'])
+            minute_of_day = minutes % MINUTES_PER_DAY
+            clock = np.array([f"{m // 60:02d}:{m % 60:02d}" for m in range(MINUTES_PER_DAY)], dtype=object)
+            sessions = np.array([Session(label) for label in SESSION_LABELS] + [None], dtype=object)
+            codes = pd.Categorical(self.df['session'], categories=SESSION_LABELS).codes
+            self._context = {
+                'session': sessions[codes],
+                'time_of_day': clock[minute_of_day],
+                # 1970-01-01 was a Thursday (dayofweek 3)
+                'day_of_week': ((minutes // MINUTES_PER_DAY + 3) % 7).tolist(),
+            }
+        return self._context
 
     def extract_compressions(self, min_bars: int = 12, max_atr_ratio: float = 0.8) -> List[CompressionEvent]:
         """
@@ -123,94 +190,78 @@ class StructureExtractor:
         Optimized Approach:
         - Identify contiguous blocks where condition is met.
         - Merge them into a single 'CompressionEvent'.
+        Blocks are found and aggregated in one vectorized pass (see compression_table).
         """
-        compressions = []
-        from schema import CompressionEvent
-        
-        df = self.df.copy()
-        
-        # Calculate bar range (High - Low)
-        df['tr'] = df['high'] - df['low']
-        
-        # Calculate 'local volatility' over 'min_bars'
-        # We want to see if recent N bars are 'quiet'
-        # Let's use the average TR of the last N bars
-        df['local_atr'] = df['tr'].rolling(window=min_bars).mean()
-        
-        # Comparator: Is local_atr < (Global/Session Factor) * Rolling ATR(14)?
-        # df['atr'] is already ATR(14).
-        
+        return self.compression_table(min_bars, max_atr_ratio).to_events()
+
+    def compression_table(self, min_bars: int = 12, max_atr_ratio: float = 0.8) -> EventTable:
+        """
+        Compressions as an EventTable: run-length encoding of the compressed mask gives the
+        blocks, segment_mean the per-block TR / ATR means. No groupby, no per-block loop,
+        and the rolling local ATR is cached per min_bars, so sweeping max_atr_ratio only
+        redoes the comparison and the block sums.
+        """
+        first, last = self.compression_blocks(min_bars, max_atr_ratio)
+        return self._compression_table(first, last, min_bars)
+
+    def compression_blocks(self, min_bars: int = 12, max_atr_ratio: float = 0.8):
+        """(first, last) rows of every contiguous compressed block."""
+        tr, local_atr = self._local_range(min_bars)
+        atr = self.df['atr'].to_numpy(dtype=np.float64)
+
         # Condition: Is the volatility of the last N bars significantly lower than the medium-term ATR?
-        df['is_compressed'] = df['local_atr'] < (df['atr'] * max_atr_ratio)
-        
-        # Filter for True
-        compressed_mask = df['is_compressed'].fillna(False)
-        
-        # Group contiguous True regions
-        # Create a group ID that changes every time the condition flips
-        df['group_id'] = (compressed_mask != compressed_mask.shift()).cumsum()
-        
-        # Filter only the groups that are True
-        active_groups = df[compressed_mask].groupby('group_id')
-        
-        for group_id, group_df in active_groups:
-            # group_df is a contiguous block of bars that satisfy the compression criteria
-            # But wait, 'is_compressed' is a trailing indicator.
-            # If at index 100, is_compressed is True, it means bars 88-100 were quiet.
-            # We should probably define the event as "Active Compression" starting from when it FIRST became true
-            # until it stops being true.
-            
-            first_bar_idx = group_df.index[0]
-            last_bar_idx = group_df.index[-1]
-            
-            # The actual start of the quiet period was (first_bar_idx - min_bars + 1)
-            # But let's just use the detection time for simplicity in Event generation, 
-            # or map it back. 
-            # Let's say the Event starts when Detection Starts.
-            
-            start_time = group_df['time'].iloc[0]
-            end_time = group_df['time'].iloc[-1]
-            
-            # Metrics
-            avg_tr_during_event = group_df['tr'].mean()
-            mean_atr_during_event = group_df['atr'].mean()
-            
-            # Simple context
-            row = group_df.iloc[-1] # Context at end of event
-            
-            event_id = f"COMP-{start_time.isoformat()}"
-            
-            context = ContextTags(
-                session=Session(row['session']) if row['session'] in ["ASIA", "LONDON"] else Session.OTHER,
-                regime=Regime.LOW_VOL, 
-                time_of_day=row['time'].strftime('%H:%M'),
-                day_of_week=row['time'].dayofweek,
-                distance_to_vwap_std=(row['close'] - row['vwap']) / row['atr'] if row['atr'] > 0 else 0
-            )
+        # (NaN warm-up compares False)
+        compressed = local_atr < (atr * max_atr_ratio)
 
-            # Bar count is: (last_bar - first_bar) + min_bars? 
-            # Since each True means "The LAST min_bars were compressed", 
-            # A sequence of 1 True means a duration of min_bars.
-            # A sequence of 2 Trues means min_bars + 1.
-            duration_bars = len(group_df) + min_bars - 1
-            
-            comp_event = CompressionEvent(
-                id=event_id,
-                event_type=EventType.COMPRESSION,
-                start_bar=start_time, # Technically the signal start
-                end_bar=end_time,
-                confirmed_at=end_time, # Confirmed at the close of the block
-                direction=Direction.NEUTRAL,
-                confidence_score=min(1.0, duration_bars / 20.0), # Longer compression = higher confidence?
-                context=context,
-                bar_count=duration_bars,
-                average_true_range=float(avg_tr_during_event),
-                compression_ratio=float(avg_tr_during_event / mean_atr_during_event) if mean_atr_during_event > 0 else 0
-            )
-            
-            compressions.append(comp_event)
-            
-        return compressions
+        # Contiguous True regions: +1 where a block opens, -1 one past where it closes
+        edges = np.diff(np.r_[0, compressed.view(np.int8), 0])
+        return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1) - 1
+
+    def _compression_table(self, first: np.ndarray, last: np.ndarray, min_bars: int) -> EventTable:
+        df = self.df
+        tr, _ = self._local_range(min_bars)
+        atr = df['atr'].to_numpy(dtype=np.float64)
+        count = last - first + 1
+
+        # Per-block means (equal-length blocks are reduced together; see segment_mean)
+        avg_tr = segment_mean(tr, first, count)
+        mean_atr = segment_mean(atr, first, count)
+
+        # Since each True means "The LAST min_bars were compressed",
+        # A sequence of 1 True means a duration of min_bars.
+        duration_bars = count + min_bars - 1
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # Simple context at the end of the event
+            atr_end = atr[last]
+            close_end = df['close'].to_numpy(dtype=np.float64)[last]
+            vwap_end = df['vwap'].to_numpy(dtype=np.float64)[last]
+            vwap_dist = np.where(atr_end > 0, (close_end - vwap_end) / atr_end, 0.0)
+            ratio = np.where(mean_atr > 0, avg_tr / mean_atr, 0.0)
+
+        return EventTable.build(
+            df['time'], self._bar_context(), len(first),
+            event_type=EVENT_CODES[EventType.COMPRESSION],
+            direction=DIRECTION_CODES[Direction.NEUTRAL],
+            regime=REGIME_CODES[Regime.LOW_VOL],
+            start_idx=first, # Technically the signal start
+            end_idx=last,
+            confirmed_idx=last, # Confirmed at the close of the block
+            confidence=np.minimum(1.0, duration_bars / 20.0), # Longer compression = higher confidence?
+            vwap_dist=vwap_dist,
+            magnitude=ratio,
+            bar_count=duration_bars,
+            average_true_range=avg_tr * self.price_scale,
+        )
+
+    def _local_range(self, min_bars: int):
+        """Bar range (High - Low) and its rolling mean over min_bars, cached per min_bars."""
+        if min_bars not in self._local_ranges:
+            tr = (self.df['high'] - self.df['low']).to_numpy(dtype=np.float64)
+            # Average TR of the last N bars (pandas rolling mean, as the block mask always used)
+            local_atr = pd.Series(tr).rolling(window=min_bars).mean().to_numpy()
+            self._local_ranges[min_bars] = (tr, local_atr)
+        return self._local_ranges[min_bars]
 
     def extract_displacements(self, min_atr_magnitude: float = 2.0, min_volume_z: float = 1.5) -> List[DisplacementEvent]:
         """
@@ -219,62 +270,49 @@ class StructureExtractor:
         - Range (High-Low) >= min_atr_magnitude * ATR(14)
         - Volume >= Mean_Volume + min_volume_z * Std_Volume (local z-score)
         """
-        displacements = []
-        from schema import DisplacementEvent # Ensure runtime availability if top-level fails (it shouldn't)
-        
-        df = self.df.copy()
-        
-        # 1. ATR Magnitude
-        # df['atr'] exists from loader
-        df['tr'] = df['high'] - df['low']
-        df['atr_mag'] = df['tr'] / df['atr']
-        
-        # 2. Volume Z-Score
-        # Calculate local volume stats (e.g. rolling 20)
-        roll_vol_mean = df['volume'].rolling(20).mean()
-        roll_vol_std = df['volume'].rolling(20).std()
-        df['vol_z'] = (df['volume'] - roll_vol_mean) / roll_vol_std
-        
-        # Filter
-        mask = (df['atr_mag'] >= min_atr_magnitude) & (df['vol_z'] >= min_volume_z)
-        
-        candidates = df[mask]
-        
-        for idx, row in candidates.iterrows():
-            event_id = f"DISP-{row['time'].isoformat()}"
-            
+        return self.displacement_table(min_atr_magnitude, min_volume_z).to_events()
+
+    def displacement_table(self, min_atr_magnitude: float = 2.0, min_volume_z: float = 1.5) -> EventTable:
+        """Displacements as an EventTable (vectorized filter, no per-row loop)."""
+        df = self.df
+        high = df['high'].to_numpy(dtype=np.float64)
+        low = df['low'].to_numpy(dtype=np.float64)
+        open_ = df['open'].to_numpy(dtype=np.float64)
+        close = df['close'].to_numpy(dtype=np.float64)
+        atr = df['atr'].to_numpy(dtype=np.float64)
+        vwap = df['vwap'].to_numpy(dtype=np.float64)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # 1. ATR Magnitude (df['atr'] exists from loader)
+            atr_mag = (high - low) / atr
+
+            # 2. Volume Z-Score
+            # Calculate local volume stats (e.g. rolling 20)
+            volume = df['volume'].to_numpy(dtype=np.float64)
+            vol_z = (volume - sma(volume, self.VOLUME_WINDOW)) / rolling_std(volume, self.VOLUME_WINDOW)
+
+            # Filter (NaN compares False)
+            rows = np.flatnonzero((atr_mag >= min_atr_magnitude) & (vol_z >= min_volume_z))
+            vwap_dist = np.where(atr[rows] > 0, (close[rows] - vwap[rows]) / atr[rows], 0.0)
+
+        return EventTable.build(
+            df['time'], self._bar_context(), len(rows),
+            event_type=EVENT_CODES[EventType.DISPLACEMENT],
             # Direction? Close > Open = Bullish
-            direction = Direction.BULLISH if row['close'] > row['open'] else Direction.BEARISH
-            
-            context = ContextTags(
-                session=Session(row['session']) if row['session'] in ["ASIA", "LONDON"] else Session.OTHER,
-                regime=Regime.EXPANSION, 
-                time_of_day=row['time'].strftime('%H:%M'),
-                day_of_week=row['time'].dayofweek,
-                distance_to_vwap_std=(row['close'] - row['vwap']) / row['atr'] if row['atr'] > 0 else 0
-            )
-            
-            # Confidence? Higher Magnitude = Higher Confidence?
-            conf = min(1.0, row['atr_mag'] / 5.0) # Cap at 5R?
-            
-            disp = DisplacementEvent(
-                id=event_id,
-                event_type=EventType.DISPLACEMENT,
-                start_bar=row['time'],
-                end_bar=row['time'],
-                confirmed_at=row['time'], # Confirmed at Bar Close
-                direction=direction,
-                confidence_score=conf,
-                context=context,
-                magnitude_atr=float(row['atr_mag']),
-                volume_z_score=float(row['vol_z']),
-                closing_price=float(row['close'])
-            )
-            displacements.append(disp)
-            
-        return displacements
+            direction=np.where(close[rows] > open_[rows], DIRECTION_CODES[Direction.BULLISH], DIRECTION_CODES[Direction.BEARISH]),
+            regime=REGIME_CODES[Regime.EXPANSION],
+            start_idx=rows,
+            end_idx=rows,
+            confirmed_idx=rows, # Confirmed at Bar Close
+            # Confidence? Higher Magnitude = Higher Confidence? Cap at 5R
+            confidence=np.minimum(1.0, atr_mag[rows] / 5.0),
+            vwap_dist=vwap_dist,
+            magnitude=atr_mag[rows],
+            volume_z_score=vol_z[rows],
+            price_level=close[rows] * self.price_scale,
+        )
 
-    def extract_sweeps(self, swings: List[SwingEvent], min_reclaim_pts: float = 0.0) -> List[LiquiditySweepEvent]:
+    def extract_sweeps(self, swings: Union[List[SwingEvent], EventTable], min_reclaim_pts: float = 0.0) -> List[LiquiditySweepEvent]:
         """
         Identifies Liquidity Sweeps (Turtle Soups / Raids).
         Logic:
@@ -283,139 +321,330 @@ class StructureExtractor:
         
         CRITICAL: We can only sweep a swing that is CONFIRMED *before* the current bar.
         """
-        sweeps = []
-        from schema import LiquiditySweepEvent
-        
-        # Sort swings by confirmation time to ensure availability
-        # Actually, for the scanner, we need to know "what swings exist at time T?"
-        # We can iterate through the dataframe and maintain an 'active_swings' list 
-        # that updates based on confirmed_at.
-        
-        # Optimization: fast lookup
-        # But this is "extraction", usually done batch.
-        # Let's do a simple iteration over DF.
-        
-        df = self.df.sort_values('time').reset_index(drop=True)
-        
-        # Organize swings by CONFIRMATION time
-        swings_by_conf = {}
-        for s in swings:
-            if s.confirmed_at not in swings_by_conf:
-                swings_by_conf[s.confirmed_at] = []
-            swings_by_conf[s.confirmed_at].append(s)
-            
-        active_highs: List[SwingEvent] = []
-        active_lows: List[SwingEvent] = []
-        
-        # To avoid re-sweeping the same level continuously if price chops around it,
-        # usually a sweep is a discrete event. Ideally we invalidate the swing after it's swept?
-        # Or just log every sweep? The User's strategy implies "Zone Active" upon sweep.
-        # Let's log every discrete sweep event.
-        
-        for idx, row in df.iterrows():
-            curr_time = row['time']
-            
-            # 1. Update Active Structure (born at confirmed_at)
-            # Check if any swings are confirmed exactly at this bar? 
-            # Or were confirmed since last bar? 
-            # Assuming 1m data is continuous-ish.
-            
-            if curr_time in swings_by_conf:
-                new_swings = swings_by_conf[curr_time]
-                for s in new_swings:
-                    if s.event_type == EventType.SWING_HIGH:
-                        active_highs.append(s)
-                    elif s.event_type == EventType.SWING_LOW:
-                        active_lows.append(s)
-            
-            # 2. Check for Sweeps against Active Structure
-            # We check the MOST RECENT Major/Minor swings usually.
-            # User strategy: "lastMajHigh", "lastMinHigh".
-            # So we only care about the latest one.
-            
-            # Bearish Sweep (Sweep High)
-            if active_highs:
-                last_high = active_highs[-1] # The most recent confirmed high
-                
-                # Condition: High breached, but Close rejected
-                if row['high'] > last_high.price_level and row['close'] < (last_high.price_level - min_reclaim_pts):
-                    # Validate: Did this bar JUST breach it? Or was it already above?
-                    # "Sweep" implies a raid. 
-                    # User strategy logic: "high > lastMajHigh and close < lastMajHigh"
-                    # It runs on every bar.
-                    
-                    event_id = f"SWEEP-H-{curr_time.isoformat()}"
-                    
-                    context = ContextTags(
-                        session=Session(row['session']) if row['session'] in ["ASIA", "LONDON"] else Session.OTHER,
-                        regime=Regime.CHOP, # Placeholder
-                        time_of_day=row['time'].strftime('%H:%M'),
-                        day_of_week=row['time'].dayofweek,
-                        distance_to_vwap_std=0.0
-                    )
-                    
-                    sweep = LiquiditySweepEvent(
-                        id=event_id,
-                        event_type=EventType.LIQUIDITY_SWEEP,
-                        start_bar=curr_time,
-                        end_bar=curr_time,
-                        confirmed_at=curr_time, # Confirmed at Close
-                        direction=Direction.BEARISH,
-                        confidence_score=1.0,
-                        context=context,
-                        swept_level=last_high.price_level,
-                        sweep_depth=row['high'] - last_high.price_level,
-                        swing_id=last_high.id,
-                        is_major=last_high.is_major # STRICTLY REQUIRED
-                    )
-                    sweeps.append(sweep)
-
-            # Bullish Sweep (Sweep Low)
-            if active_lows:
-                last_low = active_lows[-1]
-                
-                if row['low'] < last_low.price_level and row['close'] > (last_low.price_level + min_reclaim_pts):
-                    event_id = f"SWEEP-L-{curr_time.isoformat()}"
-                    
-                    context = ContextTags(
-                        session=Session(row['session']) if row['session'] in ["ASIA", "LONDON"] else Session.OTHER,
-                        regime=Regime.CHOP,
-                        time_of_day=row['time'].strftime('%H:%M'),
-                        day_of_week=row['time'].dayofweek,
-                        distance_to_vwap_std=0.0
-                    )
-                    
-                    sweep = LiquiditySweepEvent(
-                        id=event_id,
-                        event_type=EventType.LIQUIDITY_SWEEP,
-                        start_bar=curr_time,
-                        end_bar=curr_time,
-                        confirmed_at=curr_time,
-                        direction=Direction.BULLISH,
-                        confidence_score=1.0,
-                        context=context,
-                        swept_level=last_low.price_level,
-                        sweep_depth=last_low.price_level - row['low'],
-                        swing_id=last_low.id,
-                        is_major=last_low.is_major
-                    )
-                    sweeps.append(sweep)
-                    
-        return sweeps
+        return self.sweep_table(swings, min_reclaim_pts).to_events()
+
+    def sweep_table(self, swings: Union[List[SwingEvent], EventTable], min_reclaim_pts: float = 0.0) -> EventTable:
+        """
+        Sweeps as an EventTable, fully vectorized.
+
+        User strategy: "lastMajHigh", "lastMinHigh" - only the MOST RECENT confirmed swing
+        high / low matters. Instead of walking the bars with a growing list of active swings,
+        the last confirmed swing is forward-filled onto every bar (searchsorted on the
+        confirmation rows) and the raid / reclaim test runs on whole arrays.
+        Every qualifying bar is a discrete sweep event (no re-sweep suppression), the
+        bearish one first when a bar sweeps both sides.
+        """
+        df = self.df
+        if not isinstance(swings, EventTable):
+            swings = EventTable.from_events(swings, df['time'])
+
+        # Compare in the frame's own units (ticks for compact frames -> exact integer compares)
+        scale = self.price_scale
+        min_reclaim = min_reclaim_pts / scale
+
+        high = df['high'].to_numpy(dtype=np.float64)
+        low = df['low'].to_numpy(dtype=np.float64)
+        close = df['close'].to_numpy(dtype=np.float64)
+        bars = np.arange(len(df))
+        frame_times = pd.DatetimeIndex(df['time'])
+
+        hit_rows, hit_swings, hit_bearish = [], [], []
+        for swing_type, bearish in ((EventType.SWING_HIGH, True), (EventType.SWING_LOW, False)):
+            # Swings are born at confirmed_at (matched to this frame's bars by time)
+            idx = np.flatnonzero(swings.of_type(swing_type) & (swings['confirmed_idx'] >= 0))
+            conf = frame_times.get_indexer(swings.times_of('confirmed_idx')[idx])
+            idx, conf = idx[conf >= 0], conf[conf >= 0]
+            # Same-bar confirmations keep list order, so the last one appended wins
+            order = np.argsort(conf, kind='stable')
+            idx, conf = idx[order], conf[order]
+
+            # Last swing confirmed at or before each bar (-1 = none yet)
+            last = np.searchsorted(conf, bars, side='right') - 1
+            active = last >= 0
+            level = np.full(len(df), np.nan)
+            level[active] = swings['price_level'][idx[last[active]]] / scale
+
+            with np.errstate(invalid='ignore'):
+                if bearish:
+                    # Condition: High breached, but Close rejected
+                    hit = active & (high > level) & (close < level - min_reclaim)
+                else:
+                    hit = active & (low < level) & (close > level + min_reclaim)
+            rows = np.flatnonzero(hit)
+            hit_rows.append(rows)
+            hit_swings.append(idx[last[rows]])
+            hit_bearish.append(np.full(len(rows), bearish))
+
+        rows = np.concatenate(hit_rows)
+        swing_rows = np.concatenate(hit_swings)
+        bearish = np.concatenate(hit_bearish)
+        # Bar order, bearish before bullish on the same bar
+        order = np.lexsort((~bearish, rows))
+        rows, swing_rows, bearish = rows[order], swing_rows[order], bearish[order]
+
+        swept_level = swings['price_level'][swing_rows]
+        level = swept_level / scale
+        depth = np.where(bearish, high[rows] - level, level - low[rows]) * scale
+
+        return EventTable.build(
+            df['time'], self._bar_context(), len(rows),
+            event_type=EVENT_CODES[EventType.LIQUIDITY_SWEEP],
+            direction=np.where(bearish, DIRECTION_CODES[Direction.BEARISH], DIRECTION_CODES[Direction.BULLISH]),
+            regime=REGIME_CODES[Regime.CHOP], # Placeholder
+            start_idx=rows,
+            end_idx=rows,
+            confirmed_idx=rows, # Confirmed at Close
+            confidence=1.0,
+            vwap_dist=0.0,
+            price_level=swept_level,
+            magnitude=depth,
+            swing_idx=frame_times.get_indexer(swings.times_of('start_idx')[swing_rows]),
+            is_major=swings['is_major'][swing_rows], # STRICTLY REQUIRED
+            reclaim_time_bars=0,
+        )
+
+    def extract_fvgs(self, min_gap_atr: float = 0.0) -> List[FVGEvent]:
+        """
+        Identifies Fair Value Gaps (three-bar imbalance).
+        Bullish: Low[i] > High[i-2]  (gap = High[i-2] .. Low[i])
+        Bearish: High[i] < Low[i-2]  (gap = High[i] .. Low[i-2])
+        """
+        return self.fvg_table(min_gap_atr).to_events()
+
+    def fvg_table(self, min_gap_atr: float = 0.0) -> EventTable:
+        """FVGs as an EventTable: gap masks on shifted arrays, confirmed at the third bar's close."""
+        df = self.df
+        high = df['high'].to_numpy(dtype=np.float64)
+        low = df['low'].to_numpy(dtype=np.float64)
+        close = df['close'].to_numpy(dtype=np.float64)
+        atr = df['atr'].to_numpy(dtype=np.float64)
+        vwap = df['vwap'].to_numpy(dtype=np.float64)
+
+        # Third bar of each candidate pattern (bar i vs bar i - 2)
+        third = np.arange(2, len(df))
+        bullish = low[2:] > high[:-2]
+        bearish = high[2:] < low[:-2]
+        gap_low = np.where(bullish, high[:-2], high[2:])
+        gap_high = np.where(bullish, low[2:], low[:-2])
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            gap_atr = np.where(atr[2:] > 0, (gap_high - gap_low) / atr[2:], 0.0)
+            keep = (bullish | bearish) & (gap_atr >= min_gap_atr)
+            rows = third[keep]
+            vwap_dist = np.where(atr[rows] > 0, (close[rows] - vwap[rows]) / atr[rows], 0.0)
+
+        return EventTable.build(
+            df['time'], self._bar_context(), len(rows),
+            event_type=EVENT_CODES[EventType.FVG],
+            direction=np.where(bullish[keep], DIRECTION_CODES[Direction.BULLISH], DIRECTION_CODES[Direction.BEARISH]),
+            regime=REGIME_CODES[Regime.EXPANSION],
+            start_idx=rows - 2,
+            end_idx=rows,
+            confirmed_idx=rows, # Known once the third bar closes
+            confidence=np.minimum(1.0, gap_atr[keep]), # A gap of 1 ATR or more = full confidence
+            vwap_dist=vwap_dist,
+            price_level=gap_high[keep] * self.price_scale,
+            level_low=gap_low[keep] * self.price_scale,
+            magnitude=gap_atr[keep],
+        )
+
+    def extract_session_sweeps(self, min_reclaim_pts: float = 0.0) -> List[SessionSweepEvent]:
+        """
+        Identifies sweeps of the previous session's extremes (e.g. London raiding the Asia high).
+        Bearish (SESSION_HIGH_SWEEP): High > prior session high AND Close < it - min_reclaim_pts
+        Bullish (SESSION_LOW_SWEEP):  Low < prior session low AND Close > it + min_reclaim_pts
+        Only the first raid counts: the level must still be intact earlier in the session.
+        """
+        return self.session_sweep_table(min_reclaim_pts).to_events()
+
+    def session_sweep_table(self, min_reclaim_pts: float = 0.0) -> EventTable:
+        df = self.df
+        scale = self.price_scale
+        high = df['high'].to_numpy(dtype=np.float64)
+        low = df['low'].to_numpy(dtype=np.float64)
+        close = df['close'].to_numpy(dtype=np.float64)
+        levels = self._session_levels()
+        min_reclaim = min_reclaim_pts / scale
+
+        with np.errstate(invalid='ignore'):
+            # Condition: prior session extreme raided for the first time, but Close rejected
+            bearish = (high > levels['high']) & (levels['high_before'] <= levels['high']) \
+                & (close < levels['high'] - min_reclaim)
+            bullish = (low < levels['low']) & (levels['low_before'] >= levels['low']) \
+                & (close > levels['low'] + min_reclaim)
+
+        rows = np.r_[np.flatnonzero(bearish), np.flatnonzero(bullish)]
+        is_high = np.r_[np.ones(bearish.sum(), dtype=bool), np.zeros(bullish.sum(), dtype=bool)]
+        # Bar order, high sweep before low sweep on the same bar
+        order = np.lexsort((~is_high, rows))
+        rows, is_high = rows[order], is_high[order]
+
+        level = np.where(is_high, levels['high'][rows], levels['low'][rows])
+        depth = np.where(is_high, high[rows] - level, level - low[rows])
+        return EventTable.build(
+            df['time'], self._bar_context(), len(rows),
+            event_type=np.where(is_high, EVENT_CODES[EventType.SESSION_HIGH_SWEEP], EVENT_CODES[EventType.SESSION_LOW_SWEEP]),
+            direction=np.where(is_high, DIRECTION_CODES[Direction.BEARISH], DIRECTION_CODES[Direction.BULLISH]),
+            regime=REGIME_CODES[Regime.CHOP], # Placeholder
+            start_idx=rows,
+            end_idx=rows,
+            confirmed_idx=rows, # Confirmed at Close
+            confidence=1.0,
+            vwap_dist=0.0,
+            price_level=level * scale,
+            magnitude=depth * scale,
+            swing_idx=np.where(is_high, levels['high_row'][rows], levels['low_row'][rows]),
+        )
+
+    def extract_failed_breakouts(self, within_bars: int = 5) -> List[FailedBreakoutEvent]:
+        """
+        Identifies failed breakouts of the previous session's extremes.
+        A close beyond the level (first one in the session) followed, within `within_bars`
+        bars of the same session, by a close back inside. Confirmed at the close back inside.
+        failure_mode: IMMEDIATE_REVERSAL (next bar) or GRIND_BACK.
+        """
+        return self.failed_breakout_table(within_bars).to_events()
+
+    def failed_breakout_table(self, within_bars: int = 5) -> EventTable:
+        df = self.df
+        n = len(df)
+        close = df['close'].to_numpy(dtype=np.float64)
+        atr = df['atr'].to_numpy(dtype=np.float64)
+        vwap = df['vwap'].to_numpy(dtype=np.float64)
+        levels = self._session_levels()
+        bars = np.arange(n)
+
+        starts_list, ends_list, up_list, level_list, extreme_list = [], [], [], [], []
+        for side in ('high', 'low'):
+            level = levels[side]
+            closes_before = levels[f'close_{side}_before']
+            with np.errstate(invalid='ignore'):
+                if side == 'high':
+                    # First close above the prior session high ...
+                    breakout = (close > level) & (closes_before <= level)
+                    inside = close < level # ... and a later close back below it
+                else:
+                    breakout = (close < level) & (closes_before >= level)
+                    inside = close > level
+            # Next close back inside after every bar (n = never)
+            next_inside = np.minimum.accumulate(np.where(inside, bars, n)[::-1])[::-1]
+            next_inside = np.r_[next_inside[1:], n]
+            # Within the window and the same session (the level is per session)
+            limit = np.minimum(bars + within_bars, levels['segment_end'])
+            failed = breakout & (next_inside <= limit)
+            rows = np.flatnonzero(failed)
+            starts_list.append(rows)
+            ends_list.append(next_inside[rows])
+            up_list.append(np.full(len(rows), side == 'high'))
+            level_list.append(level[rows])
+            extreme_list.append(levels[f'{side}_row'][rows])
+
+        start = np.concatenate(starts_list)
+        end = np.concatenate(ends_list)
+        up = np.concatenate(up_list)
+        level = np.concatenate(level_list)
+        extreme = np.concatenate(extreme_list)
+        order = np.argsort(start, kind='stable')
+        start, end, up, level, extreme = start[order], end[order], up[order], level[order], extreme[order]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            vwap_dist = np.where(atr[end] > 0, (close[end] - vwap[end]) / atr[end], 0.0)
+
+        return EventTable.build(
+            df['time'], self._bar_context(), len(start),
+            event_type=EVENT_CODES[EventType.FAILED_BREAKOUT],
+            # A failed upside breakout is bearish
+            direction=np.where(up, DIRECTION_CODES[Direction.BEARISH], DIRECTION_CODES[Direction.BULLISH]),
+            regime=REGIME_CODES[Regime.CHOP], # Placeholder
+            start_idx=start,
+            end_idx=end,
+            confirmed_idx=end, # Confirmed at the close back inside
+            confidence=1.0,
+            vwap_dist=vwap_dist,
+            price_level=level * self.price_scale,
+            swing_idx=extreme,
+            reclaim_time_bars=end - start,
+        )
+
+    def _session_levels(self) -> Dict[str, np.ndarray]:
+        """
+        Previous-session extremes mapped onto every bar, plus what this session did before
+        the bar (all in frame units). Sessions are runs of (trading_date, session); running
+        highs / lows are segmented scans, so there is no groupby or per-session loop.
+            high / low                   : prior session's high / low (NaN in the first session)
+            high_row / low_row           : row where that extreme printed (first touch)
+            high_before / low_before     : this session's high / low up to the previous bar
+            close_high_before / ...      : highest / lowest close up to the previous bar
+            segment_end                  : last row of the bar's session
+        """
+        if self._levels is not None:
+            return self._levels
+        df = self.df
+        n = len(df)
+        high = df['high'].to_numpy(dtype=np.float64)
+        low = df['low'].to_numpy(dtype=np.float64)
+        close = df['close'].to_numpy(dtype=np.float64)
+
+        codes = pd.Categorical(df['session'], categories=SESSION_LABELS).codes.astype(np.int64)
+        if 'trading_date' in df.columns:
+            days = pd.to_datetime(df['trading_date']).to_numpy().astype('datetime64[D]').astype(np.int64)
+            codes = codes + days * len(SESSION_LABELS)
+        starts = segment_starts(codes)
+        segment = np.repeat(np.arange(len(starts)), np.diff(np.r_[starts, n]))
+        ends = np.r_[starts[1:], n] - 1
+
+        def running(values, mode):
+            # Running extreme of the session, and the same up to the previous bar (NaN on its first bar)
+            run = segment_accumulate(values, starts, mode)
+            before = np.r_[np.nan, run[:-1]]
+            before[starts] = np.nan
+            return run, before
+
+        run_high, high_before = running(high, 'max')
+        run_low, low_before = running(low, 'min')
+        close_high_before = running(close, 'max')[1]
+        close_low_before = running(close, 'min')[1]
+
+        def prior(run, values):
+            # Session extreme (its last running value), its first row, then shifted one session on
+            extreme = run[ends]
+            touch = np.flatnonzero(values == extreme[segment])
+            first_touch = np.full(len(starts), -1)
+            seg, first = np.unique(segment[touch], return_index=True)
+            first_touch[seg] = touch[first]
+            prev = segment - 1
+            has = prev >= 0
+            level = np.where(has, extreme[np.maximum(prev, 0)], np.nan)
+            row = np.where(has, first_touch[np.maximum(prev, 0)], -1)
+            return level, row
+
+        level_high, high_row = prior(run_high, high)
+        level_low, low_row = prior(run_low, low)
+        # A first bar has nothing before it in the session: nothing can have broken the level yet
+        self._levels = {
+            'high': level_high, 'high_row': high_row,
+            'low': level_low, 'low_row': low_row,
+            'high_before': np.where(np.isnan(high_before), -np.inf, high_before),
+            'low_before': np.where(np.isnan(low_before), np.inf, low_before),
+            'close_high_before': np.where(np.isnan(close_high_before), -np.inf, close_high_before),
+            'close_low_before': np.where(np.isnan(close_low_before), np.inf, close_low_before),
+            'segment_end': ends[segment] if n else np.zeros(0, dtype=np.int64),
+        }
+        return self._levels
 
 if __name__ == "__main__":
     from data_loader import DataLoader
     
     loader = DataLoader(r"C:\Users\CEO\.gemini\antigravity\scratch\kaizen_1m_data_ibkr_2yr.csv")
-    df = loader.load_and_process()
     
-    # Run on a subset for speed in test
-    subset = df.head(5000)
+    # Run on a subset for speed in test: only the first week is read from the processed store
+    first_day = loader.day_index()['trading_date'].iloc[0].date()
+    subset = loader.load_range(first_day, first_day + timedelta(days=7))
     
     extractor = StructureExtractor(subset)
     swings = extractor.extract_swings(left_bars=5, right_bars=5)
     
-    print(f"Found {len(swings)} swings in 5000 bars")
+    print(f"Found {len(swings)} swings in {len(subset)} bars")
     
     compressions = extractor.extract_compressions(min_bars=12, max_atr_ratio=0.8)
     print(f"Found {len(compressions)} compression events")
@@ -424,3 +653,43 @@ if __name__ == "__main__":
     print(f"Found {len(displacements)} displacement events")
     for d in displacements[:3]:
         print(d)
+
+    fvgs = extractor.extract_fvgs()
+    session_sweeps = extractor.extract_session_sweeps(min_reclaim_pts=0.25)
+    failed_breakouts = extractor.extract_failed_breakouts(within_bars=5)
+    print(f"Found {len(fvgs)} FVGs, {len(session_sweeps)} session sweeps, {len(failed_breakouts)} failed breakouts")
+    for e in session_sweeps[:2] + failed_breakouts[:2]:
+        print(e)
+
+    # Full history: array-level swing detection vs materialized events
+    from time import perf_counter
+    full = StructureExtractor(loader.load_and_process())
+    t0 = perf_counter()
+    arrays = full.swing_arrays()
+    t1 = perf_counter()
+    events = full.extract_swings()
+    t2 = perf_counter()
+    print(f"Swings on {len(full.df)} bars: arrays {t1 - t0:.3f}s | events {t2 - t1:.2f}s ({len(events)} swings)")
+
+    t0 = perf_counter()
+    tables = [full.fvg_table(), full.session_sweep_table(0.25), full.failed_breakout_table(5)]
+    print(f"FVG / session sweep / failed breakout tables: {perf_counter() - t0:.3f}s "
+          f"({', '.join(str(len(t)) for t in tables)} events)")
+
+    # Parameter grid: one pass vs one swing_table per combination
+    from itertools import product
+    combinations = list(product([3, 5, 8], [3, 5, 8], [2, 3, 4]))
+    t0 = perf_counter()
+    separate = {c: full.swing_table(*c) for c in combinations}
+    t1 = perf_counter()
+    grid = full.swing_grid(combinations)
+    t2 = perf_counter()
+    for c in combinations:
+        pd.testing.assert_frame_equal(separate[c].to_frame(), grid[c].to_frame())
+    print(f"Swing grid ({len(combinations)} combinations): separate {t1 - t0:.2f}s | grid {t2 - t1:.2f}s")
+
+    # Compression threshold sweep: local range is cached, each ratio is one vectorized pass
+    t0 = perf_counter()
+    sweep = {ratio: full.compression_table(max_atr_ratio=ratio) for ratio in (0.6, 0.7, 0.8, 0.9, 1.0)}
+    print(f"Compression sweep in {perf_counter() - t0:.3f}s: "
+          + ", ".join(f"{ratio}: {len(table)}" for ratio, table in sweep.items()))
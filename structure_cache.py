@@ -0,0 +1,160 @@
+import os
+import shutil
+from time import perf_counter
+from typing import Any, Callable, Dict, Optional
+
+import pandas as pd
+
+from data_loader import DataLoader, price_scale
+from data_store import ColumnStore, params_fingerprint
+from events import EventTable, COLUMNS
+from structure import StructureExtractor, STRUCTURE_VERSION
+
+
+class StructureCache:
+    """
+    Extracted structure persisted next to the processed bars, one columnar event file
+    per (extractor, parameters):
+
+        <cache_dir>/<loader.cache_key>/structure/<extractor>-<params hash>/  (ColumnStore)
+
+    An entry is valid for the processed-data fingerprint (loader.cache_key), the
+    extractor name, its parameters and STRUCTURE_VERSION; all four are in its metadata
+    and checked on read, so a stale file is never served. Hits are memory-mapped
+    EventTables on the loader's frame (models are still built lazily).
+
+    Usage:
+        cache = StructureCache(loader)
+        swings = cache.swings()
+        sweeps = cache.sweeps(min_reclaim_pts=0.25)
+        cache.invalidate('sweeps')   # or invalidate() for everything
+        print(cache.stats)
+    """
+
+    def __init__(self, loader: DataLoader):
+        self.loader = loader
+        self.df = loader.processed_data if loader.processed_data is not None else loader.load_and_process()
+        self.extractor = StructureExtractor(self.df)
+        self.hits = 0
+        self.misses = 0
+        self.seconds_saved = 0.0 # Build time of the entries that were served from disk
+
+    @property
+    def root(self) -> Optional[str]:
+        """Directory of this data's structure entries (None without a processed-data cache)."""
+        if not (self.loader.use_cache and self.loader.cache_key):
+            return None
+        return os.path.join(self.loader.cache_dir, self.loader.cache_key, 'structure')
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0, 'seconds_saved': self.seconds_saved}
+
+    # --- Extractors ---
+
+    def swings(self, left_bars: int = 5, right_bars: int = 5, major_factor: int = 3) -> EventTable:
+        params = {'left_bars': left_bars, 'right_bars': right_bars, 'major_factor': major_factor}
+        return self.get('swings', params, lambda: self.extractor.swing_table(left_bars, right_bars, major_factor))
+
+    def compressions(self, min_bars: int = 12, max_atr_ratio: float = 0.8) -> EventTable:
+        params = {'min_bars': min_bars, 'max_atr_ratio': max_atr_ratio}
+        return self.get('compressions', params, lambda: self.extractor.compression_table(min_bars, max_atr_ratio))
+
+    def displacements(self, min_atr_magnitude: float = 2.0, min_volume_z: float = 1.5) -> EventTable:
+        params = {'min_atr_magnitude': min_atr_magnitude, 'min_volume_z': min_volume_z}
+        return self.get('displacements', params,
+                        lambda: self.extractor.displacement_table(min_atr_magnitude, min_volume_z))
+
+    def sweeps(self, min_reclaim_pts: float = 0.0, left_bars: int = 5, right_bars: int = 5,
+               major_factor: int = 3) -> EventTable:
+        # Sweeps depend on the swings they raid, so the swing parameters are part of the key
+        params = {'min_reclaim_pts': min_reclaim_pts, 'left_bars': left_bars, 'right_bars': right_bars,
+                  'major_factor': major_factor}
+        return self.get('sweeps', params, lambda: self.extractor.sweep_table(
+            self.swings(left_bars, right_bars, major_factor), min_reclaim_pts))
+
+    def fvgs(self, min_gap_atr: float = 0.0) -> EventTable:
+        return self.get('fvgs', {'min_gap_atr': min_gap_atr}, lambda: self.extractor.fvg_table(min_gap_atr))
+
+    def session_sweeps(self, min_reclaim_pts: float = 0.0) -> EventTable:
+        return self.get('session_sweeps', {'min_reclaim_pts': min_reclaim_pts},
+                        lambda: self.extractor.session_sweep_table(min_reclaim_pts))
+
+    def failed_breakouts(self, within_bars: int = 5) -> EventTable:
+        return self.get('failed_breakouts', {'within_bars': within_bars},
+                        lambda: self.extractor.failed_breakout_table(within_bars))
+
+    # --- Generic entry point ---
+
+    def get(self, name: str, params: Dict[str, Any], build: Callable[[], EventTable]) -> EventTable:
+        """Cached table for (name, params); `build` runs on a miss and its result is stored."""
+        expected = self._entry_metadata(name, params)
+        entry = self._entry(name, expected)
+        if entry is not None and entry.exists() and entry.meta['metadata'].get('key') == expected:
+            self.hits += 1
+            self.seconds_saved += entry.meta['metadata'].get('build_seconds', 0.0)
+            columns = entry.read()
+            return EventTable({c: columns[c].to_numpy() for c in COLUMNS}, self.df['time'],
+                              self.extractor._bar_context())
+
+        self.misses += 1
+        t0 = perf_counter()
+        table = build()
+        if entry is not None:
+            entry.write(pd.DataFrame(table.columns, copy=False),
+                        metadata={'key': expected, 'build_seconds': perf_counter() - t0})
+        return table
+
+    def invalidate(self, name: Optional[str] = None) -> int:
+        """Deletes the stored entries of one extractor (or all). Returns how many were removed."""
+        root = self.root
+        if root is None or not os.path.isdir(root):
+            return 0
+        removed = 0
+        for entry in os.listdir(root):
+            if name is None or entry.startswith(f"{name}-"):
+                shutil.rmtree(os.path.join(root, entry), ignore_errors=True)
+                removed += 1
+        return removed
+
+    def _entry_metadata(self, name: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'data_key': self.loader.cache_key,
+            'n_rows': len(self.df),
+            'extractor': name,
+            'params': params,
+            'structure_version': STRUCTURE_VERSION,
+            # Compact frames give the same events up to float rounding of ticks -> points
+            'price_scale': price_scale(self.df),
+        }
+
+    def _entry(self, name: str, expected: Dict[str, Any]) -> Optional[ColumnStore]:
+        root = self.root
+        if root is None:
+            return None
+        return ColumnStore(os.path.join(root, f"{name}-{params_fingerprint(expected)[:16]}"))
+
+
+if __name__ == "__main__":
+    # Test run: cold extraction fills the cache, the second pass is served from disk
+    loader = DataLoader(r"C:\Users\CEO\.gemini\antigravity\scratch\kaizen_1m_data_ibkr_2yr.csv")
+    loader.load_and_process()
+
+    cache = StructureCache(loader)
+    cache.invalidate()
+    for attempt in ("cold", "warm"):
+        t0 = perf_counter()
+        tables = {
+            'swings': cache.swings(),
+            'compressions': cache.compressions(),
+            'displacements': cache.displacements(),
+            'sweeps': cache.sweeps(min_reclaim_pts=0.25),
+        }
+        print(f"{attempt}: {perf_counter() - t0:.3f}s | " + ", ".join(f"{k}: {len(v)}" for k, v in tables.items()))
+        if attempt == "cold":
+            reference = {k: v.to_frame() for k, v in tables.items()}
+    for name, table in tables.items():
+        pd.testing.assert_frame_equal(table.to_frame(), reference[name], check_exact=True)
+    print(f"Cached tables identical | stats: {cache.stats}")